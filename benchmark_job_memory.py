@@ -0,0 +1,76 @@
+"""Compare per-job memory of the old 6-tuple + parallel dicts layout with the slotted Job record.
+
+Usage: python benchmark_job_memory.py [number_of_jobs]
+"""
+import sys
+import random
+import tracemalloc
+
+from job import Job, parse_budget, parse_proposal_count
+
+WORDS = ("react", "node", "python", "scraping", "dashboard", "api", "shopify", "landing", "page",
+         "automation", "bot", "django", "frontend", "backend", "developer", "needed", "website", "fix")
+CATEGORIES = ("frontend", "backend", "fullstack", "automation", "scraping", "other")
+
+def iter_raw_jobs(count):
+    """Yield raw scraped fields the way they come out of the HTML parser (fresh strings per job)"""
+    rng = random.Random(0)
+    for i in range(count):
+        title = " ".join(rng.choices(WORDS, k=6)).title()
+        slug = title.replace(" ", "-")
+        url = f"https://upwork.com/jobs/{slug}_~02{1900000000000000000 + i}/?referrer_url_path=/nx/search/jobs/"
+        description = " ".join(rng.choices(WORDS, k=250))
+        price = f"${rng.randrange(50, 5000)}.00"
+        proposal = rng.choice(("Less than 5", "5 to 10", "10 to 15", "20 to 50", "50+"))
+        # Category names come back from the categorizer as fresh strings
+        cat_a, cat_b = ("".join(c) for c in rng.sample(CATEGORIES, 2))
+        yield url, title, description, price, proposal, cat_a, cat_b
+
+def tuple_layout(raw):
+    """Old layout: positional tuple with the URL twice, plus parallel dicts keyed by the full URL"""
+    jobs, descriptions, metrics, categories_by_job, message_job_map = [], {}, {}, {}, {}
+    for message_id, (url, title, description, price, proposal, cat_a, cat_b) in enumerate(raw):
+        job_data = (url, title, description, url, proposal, price)
+        jobs.append(job_data)
+        descriptions[url] = description
+        metrics[url] = parse_budget(price) + parse_proposal_count(proposal)
+        categories_by_job[url] = [cat_a, cat_b]
+        message_job_map[message_id] = url
+        # create_job_embed re-parsed the URL on every post
+        short_id = url.split("~")[1].split("/")[0]
+        if len(short_id) > 12:
+            short_id = short_id[:12] + "..."
+    return jobs, descriptions, metrics, categories_by_job, message_job_map
+
+def job_layout(raw):
+    """New layout: one Job per job, referenced by ID and by message"""
+    jobs, message_job_map = {}, {}
+    for message_id, (url, title, description, price, proposal, cat_a, cat_b) in enumerate(raw):
+        job = Job(url, title, description, price, proposal)
+        job.set_categories([cat_a, cat_b])
+        jobs[job.id] = job
+        message_job_map[message_id] = job.id
+    return jobs, message_job_map
+
+def measure(build, count):
+    """Bytes still allocated once `build` has consumed `count` freshly scraped jobs"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build(iter_raw_jobs(count))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    # Descriptions are stored once in both layouts; report them separately from per-job overhead
+    description_bytes = measure(lambda raw: [job[2] for job in raw], count)
+    print(f"{count} jobs (descriptions alone: {description_bytes / count:.0f} bytes/job)")
+    for name, layout in (("6-tuple + dicts", tuple_layout), ("slotted Job", job_layout)):
+        total = measure(layout, count)
+        overhead = total - description_bytes
+        print(f"  {name:<16} {total / count:8.1f} bytes/job total, {overhead / count:7.1f} excluding descriptions")
+
+if __name__ == "__main__":
+    main()
@@ -6,14 +6,16 @@ load_dotenv()
 
 # Bot configuration
 TOKEN = os.getenv('DISCORD_TOKEN')
-CHANNEL_IDS = {
-    'frontend': int(os.getenv('FRONTEND_CHANNEL_ID')),
-    'backend': int(os.getenv('BACKEND_CHANNEL_ID')),
-    'fullstack': int(os.getenv('FULLSTACK_CHANNEL_ID')),
-    'automation': int(os.getenv('AUTOMATION_CHANNEL_ID')),
-    'scraping': int(os.getenv('SCRAPING_CHANNEL_ID')),
-    'other': int(os.getenv('OTHER_CHANNEL_ID'))
+# Default channels, one per category. Optional: more guilds and channels can be routed with /route
+CHANNEL_ENV_VARS = {
+    'frontend': 'FRONTEND_CHANNEL_ID',
+    'backend': 'BACKEND_CHANNEL_ID',
+    'fullstack': 'FULLSTACK_CHANNEL_ID',
+    'automation': 'AUTOMATION_CHANNEL_ID',
+    'scraping': 'SCRAPING_CHANNEL_ID',
+    'other': 'OTHER_CHANNEL_ID'
 }
+CHANNEL_IDS = {category: int(os.getenv(var)) for category, var in CHANNEL_ENV_VARS.items() if os.getenv(var)}
 # Upwork configuration
 UPWORK_URL = "https://www.upwork.com/nx/search/jobs/?page=1&per_page=20&q=%28frontend%20OR%20backend%20OR%20%22full%20stack%22%20OR%20scraping%20OR%20scrapping%20OR%20automation%20OR%20automations%29&sort=recency"
 
@@ -118,4 +120,55 @@ FILTERED_TERMS = {
 COMMAND_PREFIX = '!'
 CHECK_INTERVAL = 120 # 5 minutes in seconds
 MAX_RETRIES = 3
-RETRY_DELAY = 5  # seconds 
\ No newline at end of file
+RETRY_DELAY = 5  # seconds
+
+# Process mode: 'standalone' scrapes and posts from the bot process,
+# 'consumer' only posts jobs published to the queue by scraper_worker.py
+RUN_MODE = os.getenv('RUN_MODE', 'standalone')
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', 'job_queue.db')
+QUEUE_POLL_INTERVAL = 5  # seconds
+QUEUE_RETENTION = 7 * 24 * 3600  # keep delivered jobs for a week so reposts stay idempotent
+QUEUE_RETRY_DELAY = 30  # seconds before a job with failed sends is retried, doubled after every attempt
+QUEUE_MAX_ATTEMPTS = 6  # attempts before a job is dead-lettered (about half an hour of retries)
+
+# Job archive with full-text search
+JOB_ARCHIVE_PATH = os.getenv('JOB_ARCHIVE_PATH', 'job_archive.db')
+SEARCH_PAGE_SIZE = 5
+
+# Near-duplicate repost detection
+REPOST_SIMILARITY_THRESHOLD = float(os.getenv('REPOST_SIMILARITY_THRESHOLD', '0.8'))  # title + description
+REPOST_TITLE_THRESHOLD = 0.9  # title-only match that names a candidate original, confirmed on the description
+REPOST_WINDOW = 2000  # number of recent jobs compared against
+REPOST_MODE = os.getenv('REPOST_MODE', 'suppress')  # 'suppress' drops reposts, 'thread' replies to the original post
+
+# Personal DM alerts
+SUBSCRIPTIONS_PATH = os.getenv('SUBSCRIPTIONS_PATH', 'subscriptions.db')
+MAX_SUBSCRIPTIONS_PER_USER = 25
+DM_RATE_LIMIT = 1.0  # DMs per second
+DM_BATCH_WINDOW = 2.0  # seconds to collect jobs for the same user into one DM
+
+# On-disk HTTP response cache for job detail pages
+HTTP_CACHE_PATH = os.getenv('HTTP_CACHE_PATH', 'http_cache.db')
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024  # compressed bytes on disk
+HTTP_CACHE_POLICIES = {
+    'description': 7 * 24 * 3600,  # job descriptions practically never change
+    'activity': 5 * 60,  # proposals/interviewing counts go stale quickly
+}
+
+# Number of recent jobs kept in memory for Show More; older ones are read from the archive
+JOB_CACHE_SIZE = 2000
+MESSAGE_MAP_SIZE = 10000  # posted message IDs remembered for Show More; older ones fall back to the embed URL
+
+# Graceful shutdown and warm restart
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', 'bot_state.json.gz')
+SHUTDOWN_DRAIN_TIMEOUT = 20  # seconds to finish in-flight posts and DMs before checkpointing
+
+# Multi-guild routing
+ROUTING_PATH = os.getenv('ROUTING_PATH', 'routing.db')
+CHANNEL_SEND_RATE = 5.0  # channel posts per second across all guilds
+
+# Per-cycle deadline: detail fetches stop once a cycle has run this long, and the
+# jobs not reached are ranked again with the next cycle's new jobs
+CYCLE_TIME_BUDGET = 90  # seconds, kept below CHECK_INTERVAL
+MAX_DEFERRED_JOBS = 50  # jobs a cycle may defer; the lowest-priority ones beyond this are dropped
+HTTP_TIMEOUT = 30  # seconds an Upwork request may wait; within a cycle, also capped at the time left
@@ -0,0 +1,146 @@
+import asyncio
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger("upwork_bot")
+
+# Where self time is attributed, by substrings of the profiled function's file (or name, for builtins)
+PHASES = (
+    ('HTTP', ('requests', 'urllib3', 'cloudscraper', 'http/client', 'http_cache.py', 'ssl', 'socket')),
+    ('HTML parsing', ('bs4', 'html/parser', '_markupbase', 'soupsieve')),
+    ('Categorization', ('job_categorizer.py', 'repost_detector.py', 'subscriptions.py', 'guild_routing.py', 'job.py')),
+    ('Discord sends', ('discord/', 'aiohttp', 'message_sender.py')),
+    ('Idle in event loop', ('selectors.py', 'select.epoll', 'select.kqueue', 'select.select')),
+)
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 15
+
+class PhaseClock:
+    """Wall-clock time per phase, measured with time.perf_counter() while a cycle is profiled.
+
+    cProfile's self time can't tell which phase an await was waiting for, so the
+    scraper and senders mark their steps with measure(); outside a profiled cycle
+    it only costs two perf_counter() calls.
+    """
+
+    def __init__(self):
+        self.totals = None
+
+    @contextmanager
+    def measure(self, phase):
+        totals = self.totals
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if totals is not None:
+                totals[phase] = totals.get(phase, 0.0) + time.perf_counter() - started
+
+    def start(self):
+        self.totals = {}
+
+    def stop(self):
+        totals, self.totals = self.totals or {}, None
+        return totals
+
+# Shared by the modules whose steps are timed
+phase_clock = PhaseClock()
+
+def phase_of(filename, function_name):
+    text = function_name if filename == '~' else filename.replace('\\', '/')
+    for phase, patterns in PHASES:
+        if any(pattern in text for pattern in patterns):
+            return phase
+    return 'Other'
+
+class CycleProfiler:
+    """Profiles the next scrape cycle when asked to; cycles run unprofiled otherwise.
+
+    Profiling is deterministic (cProfile) and covers every task that runs while the
+    cycle is in flight, including the rate-limited senders, plus tracemalloc
+    allocation tracking.
+    """
+
+    def __init__(self):
+        self.waiters = []
+
+    @property
+    def requested(self):
+        return bool(self.waiters)
+
+    def request(self):
+        """Ask for the next cycle to be profiled. Returns a future resolving to the text report."""
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        return future
+
+    def withdraw(self, future):
+        """Drop a request nobody is waiting for any more, so the next cycle isn't profiled for it"""
+        if future in self.waiters:
+            self.waiters.remove(future)
+        future.cancel()
+
+    async def run(self, cycle):
+        """Run `cycle()` under the profiler and hand the report to everyone who asked for it"""
+        waiters, self.waiters = self.waiters, []
+        profiler = cProfile.Profile()
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        started = time.perf_counter()
+        phase_clock.start()
+        profiler.enable()
+        try:
+            result = await cycle()
+        finally:
+            profiler.disable()
+            wall_time = time.perf_counter() - started
+            phase_wall_times = phase_clock.stop()
+            snapshot = tracemalloc.take_snapshot()
+            if not tracing:
+                tracemalloc.stop()
+            report = self.build_report(profiler, snapshot, wall_time, phase_wall_times)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(report)
+            logger.info(f"Profiled scrape cycle ({wall_time:.1f}s) for {len(waiters)} requester(s)")
+        return result
+
+    @staticmethod
+    def build_report(profiler, snapshot, wall_time, phase_wall_times=None):
+        stats = pstats.Stats(profiler)
+        phase_times = {}
+        for (filename, _, function_name), (_, _, self_time, _, _) in stats.stats.items():
+            phase = phase_of(filename, function_name)
+            phase_times[phase] = phase_times.get(phase, 0.0) + self_time
+        profiled_time = sum(phase_times.values()) or 1.0
+
+        out = io.StringIO()
+        out.write(f"Scrape cycle profile - wall time {wall_time:.2f}s, profiled time {profiled_time:.2f}s\n")
+
+        if phase_wall_times:
+            out.write("\nWall-clock time by phase\n")
+            out.write("(Discord sends run alongside fetching, and a send waiting while a blocking HTTP request "
+                      "holds the event loop counts that time too, so phases can add up to more than the wall time)\n")
+            for phase, seconds in sorted(phase_wall_times.items(), key=lambda item: item[1], reverse=True):
+                out.write(f"  {phase:<20} {seconds:8.3f}s  {seconds / wall_time:6.1%} of wall time\n")
+
+        out.write("\nSelf time by phase\n")
+        out.write("(time spent awaiting Discord shows up here as idle time in the event loop)\n")
+        for phase, seconds in sorted(phase_times.items(), key=lambda item: item[1], reverse=True):
+            out.write(f"  {phase:<20} {seconds:8.3f}s  {seconds / profiled_time:6.1%}\n")
+
+        out.write(f"\nTop {TOP_FUNCTIONS} functions by cumulative time\n")
+        stats.stream = out
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+
+        out.write(f"\nTop {TOP_ALLOCATIONS} allocation sites still live at the end of the cycle\n")
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+            out.write(f"  {stat.size / 1024:10.1f} KiB in {stat.count:6d} blocks  {stat.traceback}\n")
+        return out.getvalue()
@@ -3,16 +3,29 @@ from discord.ext import commands, tasks
 import os
 from dotenv import load_dotenv
 import asyncio
+import io
 import sys
 import time
 from discord.ui import Button, View
 import logging
+import signal
 import subprocess # Keep this import
 from discord import app_commands # Keep this import
 
-from config import TOKEN, CHANNEL_IDS, JOB_CATEGORIES, COMMAND_PREFIX, CHECK_INTERVAL
+from config import TOKEN, CHANNEL_IDS, JOB_CATEGORIES, COMMAND_PREFIX, CHECK_INTERVAL, RUN_MODE, QUEUE_POLL_INTERVAL, SEARCH_PAGE_SIZE
+from config import MAX_SUBSCRIPTIONS_PER_USER, DM_RATE_LIMIT, DM_BATCH_WINDOW
+from config import SNAPSHOT_PATH, SHUTDOWN_DRAIN_TIMEOUT, CHANNEL_SEND_RATE, CYCLE_TIME_BUDGET
 from job_scraper import UpworkScraper
+from job import Job, parse_job_id, job_url_for
 from job_categorizer import JobCategorizer
+from job_queue import JobQueue, ALERTS_DESTINATION
+from job_archive import JobArchive
+from subscriptions import SubscriptionStore, normalize_keyword, MAX_KEYWORD_WORDS
+from guild_routing import GuildRouter
+from message_sender import RateLimitedSender
+from scan_coordinator import ScanCoordinator
+from cycle_profiler import CycleProfiler, phase_clock
+from state_snapshot import save_snapshot, load_snapshot
 from utils import restart_warp  # Import restart_warp from utils.py
 
 # Configure logging
@@ -40,39 +53,38 @@ bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents)
 # Initialize job scraper
 job_scraper = UpworkScraper()
 
+# In consumer mode jobs come from scraper_worker.py processes through the shared queue
+job_queue = JobQueue() if RUN_MODE == 'consumer' else None
+
+# Archive of every scraped job, searchable with /search
+job_archive = JobArchive()
+
+# Personal alert rules, matched against every posted job
+subscription_store = SubscriptionStore()
+
+# Category -> channel routing for every guild, managed with /route
+guild_router = GuildRouter()
+
 # Variable to track the latest job
 old_job = None
 # Flag to track if this is the first run
 first_run = True
 
 # Helper function to create the initial job embed
-def create_job_embed(job_category, job_data):
-    job_id, title, description, link, proposal, price = job_data
+def create_job_embed(job_category, job):
     emoji = JOB_CATEGORIES[job_category]['emoji']
     
     embed = discord.Embed(
-        title=f"{emoji} {title}", 
-        url=link, 
+        title=f"{emoji} {job.title}", 
+        url=job.url, 
         color=discord.Color.blue() # Or choose a color you like
     )
-    embed.add_field(name="Price", value=price if price else "N/A", inline=True)
-    embed.add_field(name="Proposals", value=proposal if proposal else "N/A", inline=True)
+    embed.add_field(name="Price", value=job.price if job.price else "N/A", inline=True)
+    embed.add_field(name="Proposals", value=job.proposal if job.proposal else "N/A", inline=True)
     # We don't add the description here initially
     
-    # Extract a shorter job ID from the URL
-    short_job_id = "Unknown"
-    if link and "~" in link:
-        try:
-            # Try to extract the job ID number part after the tilde
-            short_job_id = link.split("~")[1].split("/")[0]
-            # If it's too long, truncate it
-            if len(short_job_id) > 12:
-                short_job_id = short_job_id[:12] + "..."
-        except:
-            # Fallback if extraction fails
-            pass
-    
-    embed.set_footer(text=f"Job ID: {short_job_id}")
+    # The canonical numeric ID, usable with !filter
+    embed.set_footer(text=f"Job ID: {job.id}")
     # Removed the hidden field code here
     
     return embed
@@ -81,137 +93,269 @@ def create_job_embed(job_category, job_data):
 class JobView(View):
     def __init__(self, job_id, job_url):  # Add job_url parameter
         super().__init__(timeout=None) # Persist view across bot restarts (optional)
-        self.job_id = job_id # This is the short ID for the button
+        self.job_id = job_id # This is the canonical job ID for the button
         self.job_url = job_url # Store the full URL here
         
         # Create a shorter custom ID using a hash of the short job_id
         short_id_hash = str(hash(job_id) % 1000000)  # Use the short_id for the hash
         self.add_item(Button(label="Show More", style=discord.ButtonStyle.primary, custom_id=f"show_{short_id_hash}"))
 
-async def send_discord_message(job_category, job_data):
-    job_id, title, description, link, proposal, price = job_data
-    try:
-        channel_id = CHANNEL_IDS.get(job_category)
-        if not channel_id:
-            logger.warning(f"No channel ID found for category: {job_category}")
-            return
+async def send_discord_message(channel_id, job_category, job):
+    """Post a job to a channel routed for its category. Returns False if the send should be retried.
 
+    If the job reposts one already posted in the channel, it is sent as a reply to that post.
+    A channel that no longer exists or doesn't let the bot post is logged and skipped
+    (True): retrying can't fix it, and it shouldn't hold the job back from other channels.
+    """
+    success = False
+    try:
         channel = bot.get_channel(channel_id)
         if not channel:
-            logger.warning(f"Could not find channel with ID: {channel_id}")
-            return
+            logger.warning(f"Could not find channel with ID: {channel_id}, skipping job {job.id}")
+            return True
 
-        logger.info(f"Preparing job for channel: {channel.name} (ID: {channel.id}) - Job Link: {link}") # Log the link
+        logger.info(f"Preparing job for channel: {channel.name} (ID: {channel.id}) - Job Link: {job.url}") # Log the link
         
         # Create the initial embed
-        embed = create_job_embed(job_category, job_data)
-        # Get the short ID from the footer for the View
-        short_job_id = embed.footer.text.split("Job ID: ")[1]
+        embed = create_job_embed(job_category, job)
+        
+        # Pass the job ID and the full link to the View
+        view = JobView(job.id, job.url) 
         
-        # Pass the short ID and the full link to the View
-        view = JobView(short_job_id, link) 
+        # Thread reposts under the original post in this channel, if we still know it
+        reference = None
+        if job.repost_of:
+            for original_channel_id, original_message_id in job_scraper.job_messages.get(job.repost_of, []):
+                if original_channel_id == channel.id:
+                    reference = discord.MessageReference(
+                        message_id=original_message_id, channel_id=channel.id, fail_if_not_exists=False
+                    )
+                    break
         
         # Add retry logic for sending messages
         max_retries = 3
         retry_count = 0
-        success = False
         
         while retry_count < max_retries and not success:
             try:
-                message = await channel.send(embed=embed, view=view)
-                logger.info(f"Successfully sent job {short_job_id} ({title}) to {job_category} channel (Message ID: {message.id})") # Log short ID & message ID
+                message = await channel.send(embed=embed, view=view, reference=reference)
+                logger.info(f"Successfully sent job {job.id} ({job.title}) to {job_category} channel (Message ID: {message.id})") # Log job ID & message ID
                 # Store the mapping
-                job_scraper.message_job_map[message.id] = link
+                job_scraper.record_job_message(job, channel.id, message.id)
                 success = True
+            except (discord.Forbidden, discord.NotFound) as e:
+                logger.warning(f"Cannot post job {job.id} to channel {channel_id}, skipping it: {e}")
+                return True
             except discord.errors.RateLimited as e:
                 retry_after = e.retry_after
-                logger.warning(f"Rate limited sending job {short_job_id}. Waiting {retry_after:.2f} seconds...")
+                logger.warning(f"Rate limited sending job {job.id}. Waiting {retry_after:.2f} seconds...")
                 await asyncio.sleep(retry_after)
                 retry_count += 1
             except Exception as e:
-                logger.error(f"Failed to send job {short_job_id} (attempt {retry_count + 1}/{max_retries}): {e}")
+                logger.error(f"Failed to send job {job.id} (attempt {retry_count + 1}/{max_retries}): {e}")
                 
                 retry_count += 1
                 await asyncio.sleep(5)  # Wait before retrying
         
         if not success:
-            logger.error(f"Failed to send job {short_job_id} after {max_retries} attempts: {title}")
+            logger.error(f"Failed to send job {job.id} after {max_retries} attempts: {job.title}")
 
     except Exception as e:
         
-        logger.error(f"Error in send_discord_message for job link {link}: {e}") # Log the link on error
+        logger.error(f"Error in send_discord_message for job link {job.url}: {e}") # Log the link on error
         import traceback
         traceback.print_exc()
 
+    return success
+
+async def send_channel_post(channel_id, items):
+    """Sender callback: post one (category, job) item to a channel"""
+    job_category, job = items[0]
+    with phase_clock.measure('Discord sends'):
+        return await send_discord_message(channel_id, job_category, job)
+
+# Channel posts for every guild share one rate limit, with a lane per channel so a
+# failing channel only delays its own posts
+channel_sender = RateLimitedSender(send_channel_post, CHANNEL_SEND_RATE)
+
+def submit_job_posts(job, already_delivered=()):
+    """Queue a categorized job for every routed channel, skipping channel IDs in `already_delivered`.
+
+    Returns {channel_id: future resolving to True once the post was sent}.
+    """
+    return {channel_id: channel_sender.submit(channel_id, (category, job))
+            for channel_id, category in guild_router.destinations(job)
+            if str(channel_id) not in already_delivered}
+
+async def post_job(job, already_delivered=()):
+    """Fan a categorized job out to every routed channel and wait for the posts. Returns {channel_id: sent}."""
+    futures = submit_job_posts(job, already_delivered)
+    results = await asyncio.gather(*futures.values())
+    return dict(zip(futures, results))
+
+async def send_subscription_dms(user_id, embeds):
+    """Deliver a batch of matching jobs to a subscriber in one DM"""
+    try:
+        with phase_clock.measure('Discord sends'):
+            user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+            await user.send(content=f"🔔 {len(embeds)} new job(s) matching your subscriptions", embeds=embeds)
+        logger.info(f"Sent {len(embeds)} subscription alert(s) to user {user_id}")
+    except discord.Forbidden:
+        logger.warning(f"Cannot DM user {user_id}; they may have DMs disabled")
+
+# DMs are batched per user and rate limited so alert bursts don't trip Discord's limits
+dm_sender = RateLimitedSender(send_subscription_dms, DM_RATE_LIMIT, DM_BATCH_WINDOW, max_batch=10)
+
+def notify_subscribers(job):
+    """Queue DM alerts for every user with a subscription matching the job. Returns the send futures."""
+    user_ids = subscription_store.match(job.title, job.description, job.metrics)
+    if not user_ids:
+        return []
+    logger.info(f"Job {job.id} matched subscriptions of {len(user_ids)} user(s)")
+    embed = create_job_embed(job.categories[0], job)
+    return [dm_sender.submit(user_id, embed) for user_id in user_ids]
+
+def record_alerts_sent(job_id, futures):
+    """Mark a queued job's alerts delivered once every DM for it has gone out"""
+    def on_sent(gathered):
+        if gathered.cancelled() or not all(result is True for result in gathered.result()):
+            logger.warning(f"Alerts for job {job_id} were not all sent, leaving them undelivered")
+            return
+        job_queue.mark_delivered(job_id, ALERTS_DESTINATION)
+    asyncio.gather(*futures, return_exceptions=True).add_done_callback(on_sent)
+
+def job_priority(title):
+    """Rank a search result before its details are fetched: subscribed keywords first, then routed categories"""
+    if subscription_store.matches_title(title):
+        return 2
+    if any(guild_router.index.get(category) for category in JobCategorizer.get_job_category(title, "")):
+        return 1
+    return 0
+
+# Within a cycle's time budget, jobs someone will see are fetched and posted first
+job_scraper.prioritize = job_priority
+
+def process_job(job, stats):
+    """Categorize one job, queue it for its routed channels and alert subscribers.
+
+    Returns the post futures by channel ID, without waiting for them.
+    """
+    try:
+        # Get job categories, skipping jobs filtered based on keywords
+        with phase_clock.measure('Categorization'):
+            categories = JobCategorizer.categorize_job(job)
+        if categories is None:
+            logger.info(f"Filtered job by content: {job.title} ({job.id})")
+            job_scraper.add_filtered_job(job.id)
+            stats['filtered'] += 1
+            return {}
+        
+        logger.info(f"Processing job: {job.title} ({job.id}) for categories: {categories}")
+        
+        # Queue for every channel routed for the job's categories, in all guilds
+        with phase_clock.measure('Categorization'):
+            posts = submit_job_posts(job)
+            notify_subscribers(job)
+        return posts
+        
+    except Exception as e:
+        logger.error(f"Error processing job {job.id}: {e}")
+        import traceback
+        traceback.print_exc() # Print full traceback for debugging
+        return {}
+
+async def run_check_cycle():
+    """Fetch, categorize and post one batch of Upwork jobs within CYCLE_TIME_BUDGET. Returns the cycle's stats."""
+    started = time.monotonic()
+    deadline = started + CYCLE_TIME_BUDGET
+    stats = {'found': 0, 'filtered': 0, 'posted': 0, 'deferred': 0, 'deadline_hit': False, 'duration': 0.0}
+    processed = []
+    queued_posts = []
+    
+    # Each job is queued for posting as soon as it is fetched, so the highest-priority ones
+    # go out first. The fetch loop never waits on the sends: the channel lanes deliver them
+    # (and shutdown checkpoints whatever they haven't sent), however many channels there are.
+    async for job in job_scraper.iter_jobs(deadline):
+        stats['found'] += 1
+        queued_posts.append(process_job(job, stats))
+        processed.append(job)
+    
+    if not processed:
+        logger.info("No jobs found. Retrying in next cycle.")
+    
+    # Archive the whole cycle in a single batch
+    job_archive.add_jobs(processed)
+    
+    if job_scraper.first_run:
+        job_scraper.complete_first_run()
+    
+    # Fetching is done; now wait for this cycle's posts for the stats
+    for posts in queued_posts:
+        if posts and any(await asyncio.gather(*posts.values())):
+            stats['posted'] += 1
+    
+    stats['deferred'] = len(job_scraper.pending_tiles)
+    stats['deadline_hit'] = job_scraper.deadline_hit
+    stats['duration'] = time.monotonic() - started
+    logger.info(f"Job check completed in {stats['duration']:.1f}s: {stats['found']} found, "
+                f"{stats['filtered']} filtered, {stats['posted']} posted, {stats['deferred']} deferred.")
+    return stats
+
+# /profile asks for the next cycle to be profiled; other cycles only pay for one check
+cycle_profiler = CycleProfiler()
+
+async def run_scan():
+    if cycle_profiler.requested:
+        return await cycle_profiler.run(run_check_cycle)
+    return await run_check_cycle()
+
+# Every scan, scheduled or requested with !check, runs through this so cycles never overlap
+scan_coordinator = ScanCoordinator(run_scan)
+
 @tasks.loop(seconds=CHECK_INTERVAL)
 async def check_upwork_jobs():
     """Check for new Upwork jobs and send them to Discord"""
-    while True:  # Add continuous loop
-        try:
-            # Fetch jobs from Upwork
-            jobs = await job_scraper.fetch_jobs()
-            
-            if not jobs:
-                logger.info("No jobs found. Retrying in next cycle.")
-                await asyncio.sleep(CHECK_INTERVAL)  # Wait for the check interval
-                continue
-            
-            
-            new_jobs_found = False
-            newest_job_title = None
-            
-            # Process each job
-            for job_data in jobs:
-                try:
-                    job_id, title, description, link, proposal, price = job_data
-                    
-                    # Skip if job should be filtered based on keywords
-                    if JobCategorizer.is_filtered_job(title, description):
-                        logger.info(f"Filtered job by content: {title} ({job_id})")
-                        job_scraper.add_filtered_job(job_id)
-                        continue
-                    
-                    # Get job categories
-                    categories = JobCategorizer.get_job_category(title, description)
-                    
-                    logger.info(f"Processing job: {title} ({job_id}) for categories: {categories}")
-                    
-                    # Send to appropriate channels
-                    for category in categories:
-                        if category in CHANNEL_IDS:
-                            await send_discord_message(category, job_data)
-                    
-                    new_jobs_found = True
-                    if newest_job_title is None:
-                        newest_job_title = title
-                    
-                except Exception as e:
-                    # Log error with job_id if available
-                    job_id_str = f" (Job ID: {job_id})" if 'job_id' in locals() else ""
-                    
-                    logger.error(f"Error processing job{job_id_str}: {e}")
-                    import traceback
-                    traceback.print_exc() # Print full traceback for debugging
-                    continue
-            
-            # Update last job with the title of the newest job processed in this cycle
-            if new_jobs_found and newest_job_title:
-                job_scraper.update_last_job(newest_job_title)
-            
-            if job_scraper.first_run:
-                job_scraper.complete_first_run()
-            
-            # Wait for the check interval before the next cycle
-            logger.info(f"Job check completed. Waiting {CHECK_INTERVAL} seconds before next check.")
-            await asyncio.sleep(CHECK_INTERVAL)
-            
-        except Exception as e:
-            
-            logger.error(f"Major error in check_upwork_jobs loop: {e}")
-            import traceback
-            traceback.print_exc() # Print full traceback for debugging
-            # Wait before retrying after an error
-            await asyncio.sleep(CHECK_INTERVAL)
+    try:
+        await scan_coordinator.run()
+    except Exception as e:
+        logger.error(f"Major error in check_upwork_jobs loop: {e}")
+        import traceback
+        traceback.print_exc() # Print full traceback for debugging
+
+# The queue poll in progress, if any; shutdown waits for it before checkpointing
+consume_poll = None
+
+@tasks.loop(seconds=QUEUE_POLL_INTERVAL)
+async def consume_job_queue():
+    """Post categorized jobs published to the queue by scraper workers"""
+    global consume_poll
+    # Shielded so shutdown can stop the loop and still let a poll that is posting finish its bookkeeping
+    consume_poll = asyncio.create_task(consume_pending_jobs())
+    await asyncio.shield(consume_poll)
+
+async def consume_pending_jobs():
+    try:
+        for job in job_queue.fetch_pending():
+            # Keep the job around for the Show More button
+            job_scraper.remember_job(job)
+
+            # Alerts are recorded as their own destination so send retries never repeat them
+            delivered = job_queue.delivered_destinations(job.id)
+            if ALERTS_DESTINATION not in delivered:
+                record_alerts_sent(job.id, notify_subscribers(job))
+
+            results = await post_job(job, delivered)
+            for channel_id, sent in results.items():
+                if sent:
+                    job_queue.mark_delivered(job.id, channel_id)
+
+            # Jobs with failed sends stay pending and are retried with backoff, then dead-lettered
+            if all(results.values()):
+                job_queue.complete(job.id)
+    except Exception as e:
+        logger.error(f"Error consuming job queue: {e}")
+        import traceback
+        traceback.print_exc()
 
 @bot.event
 async def on_ready():
@@ -221,7 +365,7 @@ async def on_ready():
         logger.info(f'- {guild.name} (ID: {guild.id})')
     
     logger.info("Looking for channels...")
-    for category, channel_id in CHANNEL_IDS.items():
+    for category, channel_id in guild_router.all_destinations():
         channel = bot.get_channel(channel_id)
         if channel:
             logger.info(f"Found {category} channel: {channel.name}")
@@ -235,8 +379,16 @@ async def on_ready():
     except Exception as e:
         logger.error(f"Failed to sync slash commands: {e}")
 
-    # Start the job checking loop
-    check_upwork_jobs.start()
+    channel_sender.start()
+    dm_sender.start()
+
+    # Start the job checking loop, or only post from the queue when scraping runs in workers
+    if RUN_MODE == 'consumer':
+        if not consume_job_queue.is_running():
+            consume_job_queue.start()
+        logger.info("Running in consumer mode, posting jobs from the job queue.")
+    else:
+        check_upwork_jobs.start()
     logger.info("Bot is ready and listening for interactions.")
 
 @bot.event
@@ -245,14 +397,15 @@ async def on_interaction(interaction):
     if interaction.type == discord.InteractionType.component:
         if interaction.data['custom_id'].startswith('show_'):
             try:
-                # Get the job URL from the scraper's message mapping
+                # Get the job from the scraper's message mapping
                 message_id = interaction.message.id
-                job_url = job_scraper.message_job_map.get(message_id)
+                job_id = job_scraper.message_job_map.get(message_id)
+                job_url = job_url_for(job_id) if job_id else None
                 
                 # Fallback: try getting URL from the embed title link if map fails
                 if not job_url and interaction.message.embeds and interaction.message.embeds[0].url:
                     job_url = interaction.message.embeds[0].url
-                    logger.warning(f"Could not get job_url from message_job_map for {message_id}, using embed URL: {job_url}")
+                    logger.warning(f"Could not get job from message_job_map for {message_id}, using embed URL: {job_url}")
 
                 if not job_url:
                     logger.error(f"Could not retrieve job_url for message {message_id} from map or embed.")
@@ -261,17 +414,18 @@ async def on_interaction(interaction):
                 
                 logger.info(f"Retrieved job URL for 'Show More' (Message {message_id}): {job_url}")
                 
-                # Get the description from the scraper
-                description = job_scraper.get_job_description(job_url)
+                # Get the description from the scraper's cache or the archive
+                job_id = parse_job_id(job_url) or job_url
+                description = job_scraper.get_job_description(job_id) or job_archive.get_description(job_id)
                 
                 if not description:
                     # Try fetching the description again if not found in cache
                     logger.warning(f"Description for {job_url} not found in cache, attempting re-fetch.")
                     # We need title to re-fetch, get it from embed
                     title = interaction.message.embeds[0].title.split(" ", 1)[1] # Remove emoji
-                    job_data = await job_scraper._fetch_and_extract_job_details(job_url, title)
-                    if job_data:
-                        description = job_data[2] # Index 2 is description
+                    fetched_job = await job_scraper._fetch_and_extract_job_details(job_url, title)
+                    if fetched_job:
+                        description = fetched_job.description
                     else:
                         await interaction.response.send_message("Job description not available.", ephemeral=True)
                         return
@@ -314,14 +468,26 @@ async def on_interaction(interaction):
 # Command to manually check for jobs
 @bot.command(name='check')
 async def check(ctx):
-    await ctx.send("Checking for new Upwork jobs...")
+    if RUN_MODE == 'consumer':
+        await ctx.send("Scraping runs in separate worker processes; jobs are posted as workers publish them.")
+        return
+    joined = scan_coordinator.running
+    await ctx.send("A check is already running, waiting for it to finish..." if joined else "Checking for new Upwork jobs...")
     await ctx.message.add_reaction('👍')
     
-    # Force a full check
-    job_scraper.first_run = True
+    # Runs one immediate cycle, or waits for the one in flight, without starting another polling loop
+    try:
+        stats = await scan_coordinator.run()
+    except Exception as e:
+        logger.error(f"Error during on-demand check: {e}")
+        await ctx.send(f"Error checking for jobs: {e}")
+        return
     
-    # Create a separate task for checking jobs to avoid blocking the command
-    bot.loop.create_task(check_upwork_jobs())
+    message = (f"Check completed in {stats['duration']:.1f}s: {stats['found']} found, "
+               f"{stats['filtered']} filtered, {stats['posted']} posted.")
+    if stats['deadline_hit']:
+        message += f" Time budget reached; {stats['deferred']} job(s) deferred to the next check."
+    await ctx.send(message)
 
 # Command to check bot status
 @bot.command(name='status')
@@ -334,9 +500,10 @@ async def status(ctx):
         minutes, seconds = divmod(remainder, 60)
         uptime_str = f"{int(hours)}h {int(minutes)}m {int(seconds)}s"
         
-        # Get channel information
+        # Get channel information: default channels plus this server's routes
+        guild_routes = guild_router.guild_routes(ctx.guild.id)[0] if ctx.guild else []
         channel_info = []
-        for category, channel_id in CHANNEL_IDS.items():
+        for category, channel_id in list(CHANNEL_IDS.items()) + guild_routes:
             channel = bot.get_channel(channel_id)
             if channel:
                 channel_info.append(f"✅ {category}: #{channel.name}")
@@ -346,7 +513,14 @@ async def status(ctx):
         # Create status message
         status_message = f"**Bot Status**\n"
         status_message += f"Uptime: {uptime_str}\n"
-        status_message += f"Last job check: {job_scraper.last_job if job_scraper.last_job else 'None'}\n\n"
+        status_message += f"Last job seen: {job_scraper.last_job_title if job_scraper.last_job_title else 'None'}\n"
+        last_stats = scan_coordinator.last_stats
+        if last_stats:
+            status_message += (f"Last check: {last_stats['found']} found, {last_stats['filtered']} filtered, "
+                               f"{last_stats['posted']} posted in {last_stats['duration']:.1f}s\n")
+        status_message += (f"Cycle deadline hit: {job_scraper.deadline_hits} of {job_scraper.cycles} cycles "
+                           f"({len(job_scraper.pending_tiles)} jobs deferred)\n")
+        status_message += "\n"
         status_message += "**Channel Configuration**\n"
         status_message += "\n".join(channel_info)
         
@@ -413,6 +587,194 @@ async def clear(interaction: discord.Interaction, amount: int = 100):
         await interaction.followup.send("An unexpected error occurred.", ephemeral=True)
         logger.error(f"Error during /clear command execution by {interaction.user}: {e}", exc_info=True)
 
+def create_search_embed(query, page, total, results):
+    """Build the embed for one page of /search results"""
+    page_count = max((total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE, 1)
+    embed = discord.Embed(
+        title=f"🔎 Results for \"{query}\"",
+        color=discord.Color.blue()
+    )
+    if not results:
+        embed.description = "No archived jobs matched your search."
+    for result in results:
+        posted = time.strftime('%Y-%m-%d', time.localtime(result['first_seen']))
+        embed.add_field(
+            name=result['title'][:256],
+            value=f"[Open job]({result['url']}) • {result['price'] or 'N/A'} • "
+                  f"Proposals: {result['proposals'] or 'N/A'} • {result['categories']} • {posted}",
+            inline=False
+        )
+    embed.set_footer(text=f"Page {page}/{page_count} • {total} matching job(s)")
+    return embed
+
+# View with previous/next buttons for paging through /search results
+class SearchView(View):
+    def __init__(self, query, page, total):
+        super().__init__(timeout=300)
+        self.query = query
+        self.page = page
+        self.page_count = max((total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE, 1)
+        self.previous_page.disabled = page <= 1
+        self.next_page.disabled = page >= self.page_count
+
+    async def _show_page(self, interaction, page):
+        total, results = job_archive.search(self.query, page, SEARCH_PAGE_SIZE)
+        embed = create_search_embed(self.query, page, total, results)
+        await interaction.response.edit_message(embed=embed, view=SearchView(self.query, page, total))
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: Button):
+        await self._show_page(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: Button):
+        await self._show_page(interaction, self.page + 1)
+
+@bot.tree.command(name="search", description="Search archived Upwork jobs.")
+async def search(interaction: discord.Interaction, query: str, page: int = 1):
+    """Full-text search over every scraped job, best matches first."""
+    try:
+        page = max(page, 1)
+        total, results = job_archive.search(query, page, SEARCH_PAGE_SIZE)
+        embed = create_search_embed(query, page, total, results)
+        await interaction.response.send_message(embed=embed, view=SearchView(query, page, total), ephemeral=True)
+        logger.info(f"User {interaction.user} searched for '{query}' (page {page}, {total} matches)")
+    except Exception as e:
+        await interaction.response.send_message("An error occurred while searching.", ephemeral=True)
+        logger.error(f"Error during /search for '{query}' by {interaction.user}: {e}", exc_info=True)
+
+@bot.tree.command(name="subscribe", description="Get a DM when a job matches your keywords, budget and proposal limits.")
+@app_commands.describe(
+    keywords="Comma-separated keywords that must all appear, e.g. 'react, typescript'",
+    min_budget="Minimum budget in dollars (hourly jobs use the top of the rate range)",
+    fewer_proposals_than="Only jobs with fewer proposals than this"
+)
+async def subscribe(interaction: discord.Interaction, keywords: str = "", min_budget: float = None, fewer_proposals_than: int = None):
+    """Create a personal job alert."""
+    raw_keywords = [k.strip() for k in keywords.split(",") if k.strip()]
+    keyword_list = [normalize_keyword(k) for k in raw_keywords]
+    unusable = [raw for raw, keyword in zip(raw_keywords, keyword_list) if not keyword]
+    if unusable:
+        await interaction.response.send_message(
+            f"Keywords need letters or numbers to match on: {', '.join(unusable)}", ephemeral=True
+        )
+        return
+    if not keyword_list and min_budget is None and fewer_proposals_than is None:
+        await interaction.response.send_message("Please give at least one keyword, budget or proposal limit.", ephemeral=True)
+        return
+    if any(len(k.split()) > MAX_KEYWORD_WORDS for k in keyword_list):
+        await interaction.response.send_message(f"Keywords can be at most {MAX_KEYWORD_WORDS} words long.", ephemeral=True)
+        return
+    if len(subscription_store.for_user(interaction.user.id)) >= MAX_SUBSCRIPTIONS_PER_USER:
+        await interaction.response.send_message(f"You can have at most {MAX_SUBSCRIPTIONS_PER_USER} subscriptions.", ephemeral=True)
+        return
+
+    subscription = subscription_store.add(interaction.user.id, keyword_list, min_budget, fewer_proposals_than)
+    await interaction.response.send_message(
+        f"Subscribed (ID {subscription.id}): {subscription.describe()}. Matching jobs will be sent to your DMs.",
+        ephemeral=True
+    )
+
+@bot.tree.command(name="subscriptions", description="List your job alert subscriptions.")
+async def list_subscriptions(interaction: discord.Interaction):
+    """List the user's personal job alerts."""
+    subscriptions = subscription_store.for_user(interaction.user.id)
+    if not subscriptions:
+        await interaction.response.send_message("You have no subscriptions. Use /subscribe to create one.", ephemeral=True)
+        return
+    lines = "\n".join(f"- `{rule.id}`: {rule.describe()}" for rule in subscriptions)
+    await interaction.response.send_message(f"**Your Subscriptions**\n{lines}", ephemeral=True)
+
+@bot.tree.command(name="unsubscribe", description="Remove one of your job alert subscriptions.")
+async def unsubscribe(interaction: discord.Interaction, subscription_id: int):
+    """Delete a personal job alert by ID."""
+    if subscription_store.remove(interaction.user.id, subscription_id):
+        await interaction.response.send_message(f"Removed subscription {subscription_id}.", ephemeral=True)
+    else:
+        await interaction.response.send_message(f"You have no subscription with ID {subscription_id}.", ephemeral=True)
+
+CATEGORY_CHOICES = [app_commands.Choice(name=category, value=category) for category in JOB_CATEGORIES]
+
+route_group = app_commands.Group(
+    name="route",
+    description="Configure which channels in this server receive which job categories.",
+    guild_only=True,
+    default_permissions=discord.Permissions(manage_guild=True)
+)
+
+@route_group.command(name="add", description="Post jobs of a category to a channel.")
+@app_commands.choices(category=CATEGORY_CHOICES)
+async def route_add(interaction: discord.Interaction, category: str, channel: discord.TextChannel):
+    guild_router.add_route(interaction.guild_id, category, channel.id)
+    logger.info(f"User {interaction.user} routed {category} to #{channel.name} in guild {interaction.guild_id}")
+    await interaction.response.send_message(f"{category} jobs will be posted to {channel.mention}.", ephemeral=True)
+
+@route_group.command(name="remove", description="Stop posting jobs of a category to a channel.")
+@app_commands.choices(category=CATEGORY_CHOICES)
+async def route_remove(interaction: discord.Interaction, category: str, channel: discord.TextChannel):
+    if guild_router.remove_route(interaction.guild_id, category, channel.id):
+        await interaction.response.send_message(f"{category} jobs will no longer be posted to {channel.mention}.", ephemeral=True)
+    else:
+        await interaction.response.send_message(f"{category} jobs aren't routed to {channel.mention}.", ephemeral=True)
+
+@route_group.command(name="list", description="Show this server's routes and blocked terms.")
+async def route_list(interaction: discord.Interaction):
+    routes, terms = guild_router.guild_routes(interaction.guild_id)
+    lines = [f"- {category} → <#{channel_id}>" for category, channel_id in routes] or ["No routes configured."]
+    if terms:
+        lines.append(f"Blocked terms: {', '.join(terms)}")
+    await interaction.response.send_message("**Routes**\n" + "\n".join(lines), ephemeral=True)
+
+@route_group.command(name="block", description="Don't post jobs mentioning a term to this server.")
+async def route_block(interaction: discord.Interaction, term: str):
+    guild_router.block_term(interaction.guild_id, term)
+    await interaction.response.send_message(f"Jobs mentioning '{term}' won't be posted here.", ephemeral=True)
+
+@route_group.command(name="unblock", description="Remove a term blocked with /route block.")
+async def route_unblock(interaction: discord.Interaction, term: str):
+    if guild_router.unblock_term(interaction.guild_id, term):
+        await interaction.response.send_message(f"'{term}' is no longer blocked here.", ephemeral=True)
+    else:
+        await interaction.response.send_message(f"'{term}' wasn't blocked here.", ephemeral=True)
+
+bot.tree.add_command(route_group)
+
+@bot.tree.command(name="profile", description="Profile the next job check cycle (admin only).")
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+@app_commands.describe(run_now="Start a cycle right away instead of waiting for the next scheduled one")
+async def profile(interaction: discord.Interaction, run_now: bool = False):
+    """Run the next scrape cycle under the profiler and reply with the report as a file."""
+    if RUN_MODE == 'consumer':
+        await interaction.response.send_message("Scraping runs in worker processes; there is no cycle to profile here.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    report_future = cycle_profiler.request()
+    logger.info(f"User {interaction.user} requested a profile of the next cycle (run_now={run_now})")
+    if run_now and not scan_coordinator.running:
+        asyncio.create_task(scan_coordinator.run())
+    try:
+        # A scheduled cycle starts within CHECK_INTERVAL; allow time for it to finish too
+        report = await asyncio.wait_for(asyncio.shield(report_future), CHECK_INTERVAL * 3)
+    except asyncio.TimeoutError:
+        cycle_profiler.withdraw(report_future)
+        await interaction.followup.send("No cycle completed in time; the profile request was withdrawn.", ephemeral=True)
+        return
+    report_file = discord.File(io.BytesIO(report.encode('utf-8')), filename=f"cycle_profile_{int(time.time())}.txt")
+    await interaction.followup.send("Profile of the last job check cycle:", file=report_file, ephemeral=True)
+
+@profile.error
+async def profile_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    """Handles errors for the /profile command."""
+    if isinstance(error, app_commands.errors.MissingPermissions):
+        await interaction.response.send_message("You don't have permission to use this command.", ephemeral=True)
+    else:
+        logger.error(f"Error in /profile command triggered by {interaction.user}: {error}", exc_info=error)
+        if interaction.response.is_done():
+            await interaction.followup.send("An error occurred while profiling.", ephemeral=True)
+        else:
+            await interaction.response.send_message("An error occurred while profiling.", ephemeral=True)
+
 @clear.error # Error handler specifically for the /clear command
 async def clear_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
     """Handles errors for the /clear command."""
@@ -422,6 +784,74 @@ async def clear_error(interaction: discord.Interaction, error: app_commands.AppC
         await interaction.response.send_message("An error occurred.", ephemeral=True)
         logger.error(f"Error in /clear command triggered by {interaction.user}: {error}", exc_info=error)
 
+def restore_state():
+    """Warm start from the last shutdown's snapshot, if there is one"""
+    state = load_snapshot(SNAPSHOT_PATH)
+    if not state:
+        return
+    job_scraper.restore_snapshot(state.get('scraper', {}))
+    for user_id, embed_data in state.get('pending_dms', []):
+        dm_sender.submit(user_id, discord.Embed.from_dict(embed_data))
+    for channel_id, category, job_data in state.get('pending_posts', []):
+        job = Job.from_dict(job_data)
+        job_scraper.remember_job(job)
+        channel_sender.submit(channel_id, (category, job))
+
+async def shutdown(sig):
+    """Finish in-flight posts and DMs up to a deadline, checkpoint state and close the bot"""
+    if bot.is_closed() or getattr(bot, 'shutting_down', False):
+        return
+    bot.shutting_down = True
+    logger.info(f"Received {sig.name}, shutting down (up to {SHUTDOWN_DRAIN_TIMEOUT}s to drain)...")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SHUTDOWN_DRAIN_TIMEOUT
+    
+    # Stop scheduling new work, but let a cycle or queue poll that is already posting finish
+    check_upwork_jobs.cancel()
+    consume_job_queue.cancel()
+    in_flight = {task for task in (scan_coordinator.current, consume_poll) if task and not task.done()}
+    if in_flight:
+        _, unfinished = await asyncio.wait(in_flight, timeout=max(deadline - loop.time(), 0))
+        for task in unfinished:
+            logger.warning("Work in progress did not finish before the deadline, cancelling it")
+            task.cancel()
+    
+    channels_drained, dms_drained = await asyncio.gather(
+        channel_sender.drain(deadline - loop.time()), dm_sender.drain(deadline - loop.time())
+    )
+    if not dms_drained:
+        logger.warning("DM queue not drained before the deadline, unsent DMs will be sent after restart")
+    pending_dms = [[user_id, embed.to_dict()] for user_id, embed in dm_sender.take_pending()]
+    pending_posts = channel_sender.take_pending()
+    if RUN_MODE == 'consumer':
+        # Their jobs were never marked delivered, so the queue retries them
+        if pending_posts:
+            logger.warning(f"{len(pending_posts)} channel posts not sent before the deadline, "
+                           f"their jobs stay pending in the queue")
+        pending_posts = []
+    elif not channels_drained:
+        logger.warning(f"{len(pending_posts)} channel posts not sent before the deadline, they will be sent after restart")
+    
+    save_snapshot(SNAPSHOT_PATH, {
+        'scraper': job_scraper.to_snapshot(),
+        'pending_dms': pending_dms,
+        'pending_posts': [[channel_id, category, job.to_dict()] for channel_id, (category, job) in pending_posts],
+    })
+    await bot.close()
+
+async def main():
+    restore_state()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, lambda sig=sig: asyncio.create_task(shutdown(sig)))
+        except NotImplementedError:
+            # Signal handlers aren't supported by the Windows event loop
+            pass
+    async with bot:
+        await bot.start(TOKEN)
+
 # Run the bot
-restart_warp()
-bot.run(TOKEN) 
\ No newline at end of file
+if RUN_MODE != 'consumer':
+    restart_warp()
+asyncio.run(main()) 
\ No newline at end of file
@@ -0,0 +1,127 @@
+import re
+import sqlite3
+import logging
+from config import ROUTING_PATH, CHANNEL_IDS
+
+logger = logging.getLogger("upwork_bot")
+
+# Routes from the *_CHANNEL_ID environment variables are kept under this pseudo guild
+ENV_GUILD_ID = 0
+
+class GuildRouter:
+    """Guild-scoped category -> channel routing, compiled into a fan-out index.
+
+    Each guild maps categories to any number of its channels and can block extra
+    terms on top of the global filter. The index is rebuilt whenever routing
+    changes, so routing a job is a dict lookup per category.
+    """
+
+    def __init__(self, path=ROUTING_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS routes (
+                guild_id INTEGER NOT NULL,
+                category TEXT NOT NULL,
+                channel_id INTEGER NOT NULL,
+                PRIMARY KEY (guild_id, category, channel_id)
+            );
+            CREATE TABLE IF NOT EXISTS blocked_terms (
+                guild_id INTEGER NOT NULL,
+                term TEXT NOT NULL,
+                PRIMARY KEY (guild_id, term)
+            );
+        """)
+        self.conn.commit()
+        self.index = {}  # category -> [(channel_id, guild_id)]
+        self.guild_filters = {}  # guild_id -> compiled pattern of blocked terms
+        self.compile()
+
+    def compile(self):
+        """Rebuild the category -> destinations index and per-guild filters"""
+        index = {}
+        for category, channel_id in CHANNEL_IDS.items():
+            index.setdefault(category, []).append((channel_id, ENV_GUILD_ID))
+        for guild_id, category, channel_id in self.conn.execute(
+            "SELECT guild_id, category, channel_id FROM routes ORDER BY guild_id"
+        ):
+            destinations = index.setdefault(category, [])
+            if (channel_id, guild_id) not in destinations:
+                destinations.append((channel_id, guild_id))
+
+        terms_by_guild = {}
+        for guild_id, term in self.conn.execute("SELECT guild_id, term FROM blocked_terms"):
+            terms_by_guild.setdefault(guild_id, []).append(term)
+        self.guild_filters = {
+            guild_id: re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\b", re.IGNORECASE)
+            for guild_id, terms in terms_by_guild.items()
+        }
+        self.index = index
+        logger.info(f"Compiled routing index: {sum(len(d) for d in index.values())} destinations, "
+                    f"{len(self.guild_filters)} guild filters")
+
+    def destinations(self, job):
+        """Return [(channel_id, category)] for a categorized job, one entry per channel"""
+        text = None
+        blocked = {}
+        channels = {}
+        for category in job.categories:
+            for channel_id, guild_id in self.index.get(category, ()):
+                if channel_id in channels:
+                    continue
+                pattern = self.guild_filters.get(guild_id)
+                if pattern is not None:
+                    if guild_id not in blocked:
+                        if text is None:
+                            text = f"{job.title} {job.description}"
+                        blocked[guild_id] = pattern.search(text) is not None
+                    if blocked[guild_id]:
+                        continue
+                channels[channel_id] = category
+        return list(channels.items())
+
+    def add_route(self, guild_id, category, channel_id):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO routes (guild_id, category, channel_id) VALUES (?, ?, ?)",
+            (guild_id, category, channel_id)
+        )
+        self.conn.commit()
+        self.compile()
+
+    def remove_route(self, guild_id, category, channel_id):
+        """Remove a route. Returns False if it didn't exist."""
+        cursor = self.conn.execute(
+            "DELETE FROM routes WHERE guild_id = ? AND category = ? AND channel_id = ?",
+            (guild_id, category, channel_id)
+        )
+        self.conn.commit()
+        self.compile()
+        return cursor.rowcount > 0
+
+    def block_term(self, guild_id, term):
+        self.conn.execute("INSERT OR IGNORE INTO blocked_terms (guild_id, term) VALUES (?, ?)", (guild_id, term.lower()))
+        self.conn.commit()
+        self.compile()
+
+    def unblock_term(self, guild_id, term):
+        """Remove a blocked term. Returns False if it wasn't blocked."""
+        cursor = self.conn.execute(
+            "DELETE FROM blocked_terms WHERE guild_id = ? AND term = ?", (guild_id, term.lower())
+        )
+        self.conn.commit()
+        self.compile()
+        return cursor.rowcount > 0
+
+    def guild_routes(self, guild_id):
+        """Return [(category, channel_id)] and blocked terms configured for a guild"""
+        routes = self.conn.execute(
+            "SELECT category, channel_id FROM routes WHERE guild_id = ? ORDER BY category", (guild_id,)
+        ).fetchall()
+        terms = [row[0] for row in self.conn.execute(
+            "SELECT term FROM blocked_terms WHERE guild_id = ? ORDER BY term", (guild_id,)
+        )]
+        return routes, terms
+
+    def all_destinations(self):
+        """Every (category, channel_id) pair in the index"""
+        return [(category, channel_id) for category, destinations in self.index.items()
+                for channel_id, _ in destinations]
@@ -0,0 +1,146 @@
+import sqlite3
+import time
+import zlib
+import logging
+from config import HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_POLICIES
+
+logger = logging.getLogger("upwork_bot")
+
+class CachedResponse:
+    """Minimal stand-in for a requests.Response served from the cache"""
+    __slots__ = ("status_code", "text", "from_cache")
+
+    def __init__(self, status_code, text, from_cache):
+        self.status_code = status_code
+        self.text = text
+        self.from_cache = from_cache
+
+class ResponseCache:
+    """On-disk store of zlib-compressed response bodies keyed by URL, with LRU eviction past a size cap"""
+
+    def __init__(self, path=HTTP_CACHE_PATH, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access);
+        """)
+        self.conn.commit()
+
+    def get(self, url):
+        """Return (text, etag, last_modified, fetched_at) for a cached URL, or None"""
+        row = self.conn.execute(
+            "SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, fetched_at = row
+        self.conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+        self.conn.commit()
+        return zlib.decompress(body).decode("utf-8"), etag, last_modified, fetched_at
+
+    def put(self, url, text, etag=None, last_modified=None):
+        body = zlib.compress(text.encode("utf-8"), 6)
+        now = time.time()
+        # Several processes can share the cache file, so the size is measured inside the
+        # write transaction rather than tracked per process
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (url, body, etag, last_modified, fetched_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, etag, last_modified, now, now, len(body))
+            )
+            total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total_bytes > self.max_bytes:
+                self._evict(total_bytes)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def touch(self, url):
+        """Mark a cached response as freshly validated"""
+        now = time.time()
+        self.conn.execute("UPDATE responses SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+        self.conn.commit()
+
+    def _evict(self, total_bytes):
+        """Drop least recently used responses until the cache is back under 90% of its cap"""
+        target = self.max_bytes * 0.9
+        evicted = 0
+        rows = self.conn.execute("SELECT url, size FROM responses ORDER BY last_access").fetchall()
+        for url, size in rows:
+            if total_bytes <= target:
+                break
+            self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total_bytes -= size
+            evicted += 1
+        logger.info(f"Evicted {evicted} cached responses, cache size now {total_bytes} bytes")
+
+    def close(self):
+        self.conn.close()
+
+class CachedSession:
+    """Wraps the scraper session so detail pages are served from the response cache when fresh.
+
+    Freshness depends on the purpose of the request (see HTTP_CACHE_POLICIES);
+    requests without a known purpose always go to the network. Responses are only
+    cached when the caller hands them to store() after parsing them.
+    """
+
+    def __init__(self, session, cache=None, policies=HTTP_CACHE_POLICIES):
+        self.session = session
+        self.cache = cache if cache is not None else ResponseCache()
+        self.policies = policies
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url, purpose=None, timeout=None):
+        max_age = self.policies.get(purpose)
+        if max_age is None:
+            return self.session.get(url, timeout=timeout)
+
+        cached = self.cache.get(url)
+        headers = {}
+        if cached:
+            text, etag, last_modified, fetched_at = cached
+            if time.time() - fetched_at <= max_age:
+                self.hits += 1
+                return CachedResponse(200, text, True)
+            # Stale: revalidate conditionally if the server gave us validators
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        self.misses += 1
+        response = self.session.get(url, headers=headers or None, timeout=timeout)
+        if response.status_code == 304 and cached:
+            self.cache.touch(url)
+            return CachedResponse(200, cached[0], True)
+        if response.status_code == 403 and cached:
+            # Blocked while revalidating: a stale copy beats a challenge page
+            logger.warning(f"Revalidation of {url} got 403, serving the cached copy")
+            return CachedResponse(200, cached[0], True)
+        return response
+
+    def store(self, url, response):
+        """Cache a network response once the caller has parsed it successfully.
+
+        Storing is left to the caller so challenge pages and other 200 responses
+        without the expected content are never served from the cache.
+        """
+        if response.status_code != 200 or getattr(response, 'from_cache', False):
+            return
+        self.cache.put(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
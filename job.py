@@ -0,0 +1,101 @@
+import re
+import sys
+
+JOB_URL_TEMPLATE = "https://www.upwork.com/jobs/~{}"
+
+JOB_ID_PATTERN = re.compile(r"~(\d+)")
+AMOUNT_PATTERN = re.compile(r"\$\s*([\d,]+(?:\.\d+)?)\s*([kK])?")
+NUMBER_PATTERN = re.compile(r"\d+")
+
+def parse_job_id(job_url):
+    """Extract the canonical numeric job ID (the digits after '~') from a job URL, or None"""
+    match = JOB_ID_PATTERN.search(job_url or "")
+    return match.group(1) if match else None
+
+def canonical_job_url(job_url):
+    """Rewrite a job URL to its short canonical form, so caches see one URL per job"""
+    job_id = parse_job_id(job_url)
+    return JOB_URL_TEMPLATE.format(job_id) if job_id else job_url
+
+def job_url_for(job_id):
+    """Rebuild a job's canonical URL from its ID"""
+    return JOB_URL_TEMPLATE.format(job_id) if job_id.isdigit() else job_id
+
+def parse_budget(price):
+    """Parse a price string like "$500.00" or "$15.00-$35.00" into (min, max) dollars, or (None, None)"""
+    amounts = []
+    for number, thousands in AMOUNT_PATTERN.findall(price or ""):
+        amount = float(number.replace(",", ""))
+        amounts.append(amount * 1000 if thousands else amount)
+    if not amounts:
+        return None, None
+    return min(amounts), max(amounts)
+
+def parse_proposal_count(proposal):
+    """Parse a proposals string like "Less than 5", "5 to 10" or "50+" into a (min, max) range, or (None, None)"""
+    text = (proposal or "").strip().lower()
+    numbers = [int(n) for n in NUMBER_PATTERN.findall(text)]
+    if not numbers:
+        return None, None
+    if text.startswith("less than"):
+        return 0, numbers[0] - 1
+    if text.endswith("+"):
+        return numbers[0], None
+    return min(numbers), max(numbers)
+
+class Job:
+    """A scraped Upwork job.
+
+    The canonical ID and the numeric budget/proposal ranges are parsed once on
+    creation; the long search-result URL is not kept, `url` is rebuilt from the ID.
+    `categories` is None until the job is categorized, and stays None if the job
+    is filtered out.
+    """
+    __slots__ = ("id", "title", "description", "price", "proposal",
+                 "budget_min", "budget_max", "proposals_min", "proposals_max",
+                 "categories", "repost_of")
+
+    def __init__(self, url, title, description, price, proposal, categories=None, repost_of=None):
+        self.id = parse_job_id(url) or url
+        self.title = title
+        self.description = description
+        self.price = price
+        self.proposal = proposal
+        self.budget_min, self.budget_max = parse_budget(price)
+        self.proposals_min, self.proposals_max = parse_proposal_count(proposal)
+        self.categories = categories
+        self.repost_of = repost_of  # ID of the job this one reposts, when threading reposts
+
+    @property
+    def url(self):
+        return job_url_for(self.id)
+
+    @property
+    def metrics(self):
+        """(budget_min, budget_max, proposals_min, proposals_max)"""
+        return self.budget_min, self.budget_max, self.proposals_min, self.proposals_max
+
+    def set_categories(self, categories):
+        """Store categories as a tuple of interned names, or None for filtered jobs"""
+        self.categories = tuple(sys.intern(c) for c in categories) if categories is not None else None
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'title': self.title,
+            'description': self.description,
+            'price': self.price,
+            'proposal': self.proposal,
+            'categories': list(self.categories) if self.categories is not None else None,
+            'repost_of': self.repost_of,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(data['url'], data['title'], data['description'], data['price'], data['proposal'],
+                  repost_of=data.get('repost_of'))
+        job.set_categories(data.get('categories'))
+        return job
+
+    def __repr__(self):
+        return f"Job({self.id!r}, {self.title!r})"
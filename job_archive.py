@@ -0,0 +1,143 @@
+import sqlite3
+import time
+import logging
+from config import JOB_ARCHIVE_PATH
+from job import parse_job_id, canonical_job_url
+
+logger = logging.getLogger("upwork_bot")
+
+# bm25 column weights for (title, description, categories)
+TITLE_RANK_WEIGHT = 5.0
+DESCRIPTION_RANK_WEIGHT = 1.0
+CATEGORY_RANK_WEIGHT = 2.0
+
+# Bumped whenever the tables change; older archives are migrated on open
+SCHEMA_VERSION = 1
+
+class JobArchive:
+    """On-disk archive of every scraped job with an FTS5 full-text index"""
+
+    def __init__(self, path=JOB_ARCHIVE_PATH):
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # The FTS table uses the jobs table as external content so text is only stored once
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                job_id TEXT NOT NULL UNIQUE,
+                url TEXT NOT NULL,
+                title TEXT NOT NULL,
+                description TEXT NOT NULL,
+                price TEXT,
+                proposals TEXT,
+                categories TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+                title, description, categories,
+                content='jobs', content_rowid='id', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS jobs_ai AFTER INSERT ON jobs BEGIN
+                INSERT INTO jobs_fts (rowid, title, description, categories)
+                VALUES (new.id, new.title, new.description, new.categories);
+            END;
+            CREATE TRIGGER IF NOT EXISTS jobs_ad AFTER DELETE ON jobs BEGIN
+                INSERT INTO jobs_fts (jobs_fts, rowid, title, description, categories)
+                VALUES ('delete', old.id, old.title, old.description, old.categories);
+            END;
+            CREATE TRIGGER IF NOT EXISTS jobs_au AFTER UPDATE OF title, description, categories ON jobs BEGIN
+                INSERT INTO jobs_fts (jobs_fts, rowid, title, description, categories)
+                VALUES ('delete', old.id, old.title, old.description, old.categories);
+                INSERT INTO jobs_fts (rowid, title, description, categories)
+                VALUES (new.id, new.title, new.description, new.categories);
+            END;
+        """)
+        self._migrate()
+        self.conn.commit()
+
+    def _migrate(self):
+        """Bring an archive written by an older version of the bot up to SCHEMA_VERSION"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        if 'url' not in columns:
+            # Jobs used to be keyed by their full search-result URL; rekey them by numeric ID
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN url TEXT NOT NULL DEFAULT ''")
+            rows = self.conn.execute("SELECT id, job_id FROM jobs WHERE url = ''").fetchall()
+            for rowid, old_id in rows:
+                job_id = parse_job_id(old_id) or old_id
+                if self.conn.execute("SELECT 1 FROM jobs WHERE job_id = ? AND id != ?", (job_id, rowid)).fetchone():
+                    # Already archived under the new key
+                    self.conn.execute("DELETE FROM jobs WHERE id = ?", (rowid,))
+                    continue
+                self.conn.execute("UPDATE jobs SET job_id = ?, url = ? WHERE id = ?",
+                                  (job_id, canonical_job_url(old_id), rowid))
+            logger.info(f"Rekeyed {len(rows)} archived jobs by job ID")
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        logger.info(f"Migrated job archive schema from version {version} to {SCHEMA_VERSION}")
+
+    def add_jobs(self, jobs):
+        """Archive a cycle's categorized Jobs in one transaction; filtered jobs are archived too"""
+        if not jobs:
+            return
+        now = time.time()
+        rows = []
+        for job in jobs:
+            category_text = " ".join(job.categories) if job.categories else "filtered"
+            rows.append((job.id, job.url, job.title, job.description, job.price, job.proposal, category_text, now, now))
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO jobs (job_id, url, title, description, price, proposals, categories, first_seen, last_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(job_id) DO UPDATE SET "
+                    "price = excluded.price, proposals = excluded.proposals, last_seen = excluded.last_seen",
+                    rows
+                )
+            logger.info(f"Archived {len(rows)} jobs")
+        except sqlite3.Error as e:
+            logger.error(f"Error archiving jobs: {e}")
+
+    def search(self, query, page=1, page_size=5):
+        """Return (total_matches, results) for a full-text query, best matches first.
+
+        Each result is a dict with job_id, url, title, price, proposals, categories and first_seen.
+        """
+        match = self._build_match_query(query)
+        if not match:
+            return 0, []
+        offset = (max(page, 1) - 1) * page_size
+        try:
+            total = self.conn.execute(
+                "SELECT count(*) FROM jobs_fts WHERE jobs_fts MATCH ?", (match,)
+            ).fetchone()[0]
+            rows = self.conn.execute(
+                "SELECT jobs.job_id, jobs.url, jobs.title, jobs.price, jobs.proposals, jobs.categories, jobs.first_seen "
+                "FROM jobs_fts JOIN jobs ON jobs.id = jobs_fts.rowid "
+                "WHERE jobs_fts MATCH ? "
+                "ORDER BY bm25(jobs_fts, ?, ?, ?) LIMIT ? OFFSET ?",
+                (match, TITLE_RANK_WEIGHT, DESCRIPTION_RANK_WEIGHT, CATEGORY_RANK_WEIGHT, page_size, offset)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error searching archive for '{query}': {e}")
+            return 0, []
+
+        keys = ("job_id", "url", "title", "price", "proposals", "categories", "first_seen")
+        return total, [dict(zip(keys, row)) for row in rows]
+
+    def get_description(self, job_id):
+        """Get the archived description for a job ID"""
+        row = self.conn.execute("SELECT description FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _build_match_query(query):
+        """Quote each search term so user input can't break FTS5 query syntax"""
+        terms = [term.replace('"', '""') for term in query.split()]
+        return " ".join(f'"{term}"' for term in terms if term)
+
+    def close(self):
+        self.conn.close()
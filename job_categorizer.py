@@ -128,4 +128,13 @@ class JobCategorizer:
                     logger.info(f"Filtered out {category}-related job: {job_title} (matched term: {term})")
                     return True
         
-        return False 
\ No newline at end of file
+        return False 
+
+    @staticmethod
+    def categorize_job(job):
+        """Set and return the categories of a Job, or None if the job should be filtered out"""
+        if JobCategorizer.is_filtered_job(job.title, job.description):
+            job.set_categories(None)
+        else:
+            job.set_categories(JobCategorizer.get_job_category(job.title, job.description))
+        return job.categories
@@ -0,0 +1,188 @@
+import sqlite3
+import json
+import time
+import logging
+from job import Job
+from config import JOB_QUEUE_PATH, CHANNEL_IDS, QUEUE_RETRY_DELAY, QUEUE_MAX_ATTEMPTS
+
+logger = logging.getLogger("upwork_bot")
+
+# Bumped whenever the tables change; older queues are migrated on open
+SCHEMA_VERSION = 3
+
+# Delivery record for a job's subscriber DMs, kept next to its channel deliveries
+ALERTS_DESTINATION = 'alerts'
+
+class JobQueue:
+    """Durable SQLite queue of categorized jobs shared by scraper workers and the Discord poster"""
+
+    def __init__(self, path=JOB_QUEUE_PATH):
+        self.conn = sqlite3.connect(path, timeout=30)
+        # WAL lets workers publish while the poster is reading
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                categories TEXT NOT NULL,
+                published_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                completed_at REAL,
+                dead_lettered INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (completed_at, published_at);
+            CREATE TABLE IF NOT EXISTS deliveries (
+                job_id TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                delivered_at REAL NOT NULL,
+                PRIMARY KEY (job_id, destination)
+            );
+        """)
+        self._migrate()
+        self.conn.commit()
+
+    def _columns(self, table):
+        return {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+
+    def _migrate(self):
+        """Bring a queue written by an older version of the bot up to SCHEMA_VERSION"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        job_columns = self._columns('jobs')
+        if 'next_attempt_at' not in job_columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0")
+        if 'dead_lettered' not in job_columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN dead_lettered INTEGER NOT NULL DEFAULT 0")
+            # Jobs the old hard retry cap left stranded get a fresh set of attempts
+            self.conn.execute("UPDATE jobs SET attempts = 0 WHERE completed_at IS NULL")
+        # Payloads used to be positional job tuples, keyed by the full search-result URL
+        for old_id, payload, categories in self.conn.execute(
+            "SELECT job_id, payload, categories FROM jobs WHERE payload LIKE '[%'"
+        ).fetchall():
+            url, title, description, _, proposal, price = json.loads(payload)
+            job = Job(url, title, description, price, proposal)
+            job.set_categories(json.loads(categories))
+            if job.id != old_id and self.conn.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job.id,)).fetchone():
+                self.conn.execute("DELETE FROM jobs WHERE job_id = ?", (old_id,))
+                self.conn.execute("DELETE FROM deliveries WHERE job_id = ?", (old_id,))
+                continue
+            self.conn.execute("UPDATE jobs SET job_id = ?, payload = ? WHERE job_id = ?",
+                              (job.id, json.dumps(job.to_dict()), old_id))
+            self.conn.execute("UPDATE deliveries SET job_id = ? WHERE job_id = ?", (job.id, old_id))
+        if 'category' in self._columns('deliveries'):
+            self._migrate_category_deliveries()
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        logger.info(f"Migrated job queue schema from version {version} to {SCHEMA_VERSION}")
+
+    def _migrate_category_deliveries(self):
+        """Rekey deliveries from category to destination channel.
+
+        Deliveries used to be recorded per category and went to the channel set in
+        that category's *_CHANNEL_ID variable. Jobs with any delivery had also had
+        their subscriber alerts sent.
+        """
+        rows = self.conn.execute("SELECT job_id, category, delivered_at FROM deliveries").fetchall()
+        migrated = {}
+        for job_id, category, delivered_at in rows:
+            migrated[(job_id, ALERTS_DESTINATION)] = delivered_at
+            channel_id = CHANNEL_IDS.get(category)
+            if channel_id is None:
+                logger.warning(f"No channel configured for category {category}, dropping its delivery of job {job_id}")
+                continue
+            migrated[(job_id, str(channel_id))] = delivered_at
+        self.conn.execute("""
+            CREATE TABLE deliveries_new (
+                job_id TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                delivered_at REAL NOT NULL,
+                PRIMARY KEY (job_id, destination)
+            )
+        """)
+        self.conn.executemany(
+            "INSERT INTO deliveries_new (job_id, destination, delivered_at) VALUES (?, ?, ?)",
+            [(job_id, destination, delivered_at) for (job_id, destination), delivered_at in migrated.items()]
+        )
+        self.conn.execute("DROP TABLE deliveries")
+        self.conn.execute("ALTER TABLE deliveries_new RENAME TO deliveries")
+        logger.info(f"Rekeyed {len(rows)} category deliveries by destination channel")
+
+    def publish(self, job):
+        """Publish a categorized Job. Returns False if the job ID was already queued."""
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO jobs (job_id, payload, categories, published_at) VALUES (?, ?, ?, ?)",
+            (job.id, json.dumps(job.to_dict()), json.dumps(list(job.categories)), time.time())
+        )
+        self.conn.commit()
+        if cursor.rowcount:
+            logger.info(f"Published job {job.id} to queue for categories: {job.categories}")
+            return True
+        logger.info(f"Job {job.id} already in queue, skipping")
+        return False
+
+    def fetch_pending(self, limit=20, max_attempts=QUEUE_MAX_ATTEMPTS):
+        """Return categorized Jobs due for a delivery attempt, oldest first.
+
+        Each attempt pushes the job's next one back exponentially; jobs still not
+        delivered after `max_attempts` are dead-lettered so they stop being retried
+        and are purged like completed ones.
+        """
+        now = time.time()
+        rows = self.conn.execute(
+            "SELECT job_id, payload, attempts FROM jobs "
+            "WHERE completed_at IS NULL AND next_attempt_at <= ? ORDER BY published_at LIMIT ?",
+            (now, limit)
+        ).fetchall()
+        jobs = []
+        retries = []
+        dead_letters = []
+        for job_id, payload, attempts in rows:
+            if attempts >= max_attempts:
+                logger.error(f"Job {job_id} could not be delivered after {attempts} attempts, dead-lettering it")
+                dead_letters.append((now, job_id))
+                continue
+            retries.append((now + QUEUE_RETRY_DELAY * 2 ** attempts, job_id))
+            jobs.append(Job.from_dict(json.loads(payload)))
+        if retries:
+            self.conn.executemany(
+                "UPDATE jobs SET attempts = attempts + 1, next_attempt_at = ? WHERE job_id = ?", retries
+            )
+        if dead_letters:
+            self.conn.executemany(
+                "UPDATE jobs SET completed_at = ?, dead_lettered = 1 WHERE job_id = ?", dead_letters
+            )
+        if rows:
+            self.conn.commit()
+        return jobs
+
+    def delivered_destinations(self, job_id):
+        """Return the set of destinations (channel IDs as strings, or ALERTS_DESTINATION) a job was already delivered to"""
+        rows = self.conn.execute("SELECT destination FROM deliveries WHERE job_id = ?", (job_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_delivered(self, job_id, destination):
+        """Record that a job was posted to a destination"""
+        self.conn.execute(
+            "INSERT OR IGNORE INTO deliveries (job_id, destination, delivered_at) VALUES (?, ?, ?)",
+            (job_id, str(destination), time.time())
+        )
+        self.conn.commit()
+
+    def complete(self, job_id):
+        """Mark a job as fully delivered so it is no longer returned by fetch_pending"""
+        self.conn.execute("UPDATE jobs SET completed_at = ? WHERE job_id = ?", (time.time(), job_id))
+        self.conn.commit()
+
+    def purge_completed(self, older_than):
+        """Delete delivered and dead-lettered jobs finished more than `older_than` seconds ago"""
+        cutoff = time.time() - older_than
+        self.conn.execute(
+            "DELETE FROM deliveries WHERE job_id IN (SELECT job_id FROM jobs WHERE completed_at < ?)", (cutoff,)
+        )
+        self.conn.execute("DELETE FROM jobs WHERE completed_at < ?", (cutoff,))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -1,36 +1,147 @@
 import cloudscraper
+import requests
 from bs4 import BeautifulSoup
 import logging
 import asyncio
-from config import UPWORK_URL
+import time
+from collections import OrderedDict
+from config import UPWORK_URL, REPOST_SIMILARITY_THRESHOLD, REPOST_TITLE_THRESHOLD, REPOST_WINDOW, REPOST_MODE, JOB_CACHE_SIZE, MESSAGE_MAP_SIZE
+from config import CYCLE_TIME_BUDGET, MAX_DEFERRED_JOBS, HTTP_TIMEOUT
+from repost_detector import RepostDetector
+from http_cache import CachedSession
+from cycle_profiler import phase_clock
+from job import Job, parse_job_id, canonical_job_url
 
 
 logger = logging.getLogger("upwork_bot")
 
 class UpworkScraper:
-    def __init__(self):
+    def __init__(self, search_url=UPWORK_URL):
         self.scraper = cloudscraper.create_scraper()
+        # Detail pages go through the on-disk response cache; the search page never does
+        self.http = CachedSession(self.scraper)
+        self.search_url = search_url
         self.last_job_title = None
         self.first_run = True
-        self.job_descriptions = {}
+        self.jobs = OrderedDict()  # job ID -> Job, most recent last
         self.filtered_jobs = set()
-        self.message_job_map = {}
+        self.message_job_map = OrderedDict()  # message ID -> job ID, most recent last
+        # Near-duplicate detection over recent jobs, by title alone and by title + description
+        self.title_detector = RepostDetector(REPOST_TITLE_THRESHOLD, REPOST_WINDOW)
+        self.repost_detector = RepostDetector(REPOST_SIMILARITY_THRESHOLD, REPOST_WINDOW)
+        self.job_messages = OrderedDict()  # job ID -> [(channel_id, message_id)], for threading reposts
+        self.pending_tiles = []  # (job_id, title, link) not fetched before a cycle's deadline, in fetch order
+        self.prioritize = None  # Optional title -> int; higher-ranked jobs are fetched first
+        self.cycles = 0
+        self.deadline_hits = 0
+        self.deadline_hit = False  # Whether the latest cycle ran out of time
 
-    async def fetch_jobs(self):
-        """Fetch job listings from Upwork search results page"""
+    async def fetch_jobs(self, deadline=None):
+        """Fetch job listings from Upwork search results page, within the cycle's time budget"""
+        if deadline is None:
+            deadline = time.monotonic() + CYCLE_TIME_BUDGET
+        return [job async for job in self.iter_jobs(deadline)]
+
+    async def iter_jobs(self, deadline):
+        """Yield new jobs, highest priority first, until `deadline` (time.monotonic()).
+
+        This cycle's new tiles are ranked together with the tiles deferred by
+        earlier cycles. Within a priority level, new tiles come first (newest
+        first) and deferred ones after them. Tiles not reached before the deadline
+        stay in pending_tiles for the next cycle; at most MAX_DEFERRED_JOBS of them
+        are kept. Requests are cut off at the deadline too; a tile whose request
+        timed out goes to the back of pending_tiles and waits for the next cycle.
+        """
+        self.cycles += 1
+        self.deadline_hit = False
+        fresh_tiles = self._collect_new_tiles(deadline)
+
+        # The sort is stable, so within a priority level this order is kept
+        seen = set()
+        tiles = []
+        for tile in fresh_tiles + self.pending_tiles:
+            if tile[0] not in seen:
+                seen.add(tile[0])
+                tiles.append(tile)
+        if self.prioritize:
+            tiles.sort(key=lambda tile: -self.prioritize(tile[1]))
+        # Updated in place so a snapshot taken mid-cycle holds exactly the tiles not yet started
+        self.pending_tiles = tiles
+        timed_out = set()
+
+        while self.pending_tiles:
+            if time.monotonic() >= deadline:
+                self.deadline_hit = True
+                self.deadline_hits += 1
+                if len(self.pending_tiles) > MAX_DEFERRED_JOBS:
+                    logger.warning(f"Dropping {len(self.pending_tiles) - MAX_DEFERRED_JOBS} lowest-priority jobs "
+                                   f"beyond the {MAX_DEFERRED_JOBS} that can be deferred")
+                    del self.pending_tiles[MAX_DEFERRED_JOBS:]
+                logger.warning(f"Cycle deadline reached, deferring {len(self.pending_tiles)} jobs to the next cycle "
+                               f"(deadline hit in {self.deadline_hits} of {self.cycles} cycles)")
+                return
+
+            if self.pending_tiles[0][0] in timed_out:
+                break  # Only tiles that already timed out this cycle are left
+            job_id, title, job_link = self.pending_tiles.pop(0)
+
+            # Distinct jobs often share a generic title, so a title match only names a
+            # candidate original; the repost decision is made on title + description
+            with phase_clock.measure('Categorization'):
+                title_signature = RepostDetector.signature(title)
+                title_match = self.title_detector.find_similar(title_signature)
+            candidate_id = title_match[0] if title_match and title_match[0] != job_id else None
+
+            logger.info(f"Processing job: {title}")
+
+            try:
+                job = await self._fetch_and_extract_job_details(job_link, title, deadline)
+            except requests.exceptions.Timeout as e:
+                logger.warning(f"Timed out fetching details for {title}, deferring it: {e}")
+                timed_out.add(job_id)
+                self.pending_tiles.append((job_id, title, job_link))
+                continue
+            except Exception as e:
+                logger.error(f"Error processing job {title}: {e}")
+                continue
+            if not job:
+                continue
+            with phase_clock.measure('Categorization'):
+                self.title_detector.add(job.id, title_signature)
+                is_repost = self.check_repost(job, candidate_id)
+            if is_repost:
+                continue
+            yield job
+            await asyncio.sleep(1)  # Small delay between jobs
+
+    @staticmethod
+    def _request_timeout(deadline=None):
+        """Timeout for one request: HTTP_TIMEOUT, capped at the time left before `deadline`"""
+        if deadline is None:
+            return HTTP_TIMEOUT
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.exceptions.Timeout("Cycle deadline reached")
+        return min(HTTP_TIMEOUT, remaining)
+
+    def _collect_new_tiles(self, deadline=None):
+        """Read the search page and return (job_id, title, link) for each job since the last one seen, newest first"""
         try:
             logger.info("Fetching job list from Upwork...")
-            response = self.scraper.get(UPWORK_URL)
+            with phase_clock.measure('HTTP'):
+                response = self.scraper.get(self.search_url, timeout=self._request_timeout(deadline))
             
             # Check for 403 error and restart WARP if needed
             if response.status_code == 403:
                 logger.warning("Received 403 Forbidden error. Restarting WARP...")
               
                 # Retry the request after restarting WARP
-                response = self.scraper.get(UPWORK_URL)
+                with phase_clock.measure('HTTP'):
+                    response = self.scraper.get(self.search_url, timeout=self._request_timeout(deadline))
             
             html = response.text
-            soup = BeautifulSoup(html, "html.parser")
+            with phase_clock.measure('HTML parsing'):
+                soup = BeautifulSoup(html, "html.parser")
             
             job_elements = soup.find_all('h2', class_='h5 mb-0 mr-2 job-tile-title')
             if not job_elements:
@@ -39,16 +150,15 @@ class UpworkScraper:
             
             logger.info(f"Found {len(job_elements)} jobs on the page")
             
-            jobs = []
+            tiles = []
             newest_job_title = job_elements[0].text.strip()
             logger.info(f"Newest job title: {newest_job_title}")
             
             # If this is the first run, process the top 5 jobs
             limit = 5 if self.first_run else len(job_elements)
-            count = 0
             
             for job_element in job_elements:
-                if self.first_run and count >= limit:
+                if self.first_run and len(tiles) >= limit:
                     logger.info("First run limit reached")
                     break
                     
@@ -63,48 +173,53 @@ class UpworkScraper:
                     logger.info(f"Reached previously seen job: {title}")
                     break
                 
-                job_link = 'https://upwork.com' + a_tag['href']
-                logger.info(f"Processing job: {title}")
+                job_link = canonical_job_url('https://upwork.com' + a_tag['href'])
+                job_id = parse_job_id(job_link) or job_link
                 
-                try:
-                    job_data = await self._fetch_and_extract_job_details(job_link, title)
-                    if job_data:
-                        jobs.append(job_data)
-                        count += 1
-                        await asyncio.sleep(1)  # Small delay between jobs
-                except Exception as e:
-                    logger.error(f"Error processing job {title}: {e}")
+                if job_id in self.filtered_jobs:
+                    logger.info(f"Skipping manually filtered job: {title} ({job_id})")
+                    continue
+                if job_id in self.jobs:
+                    logger.info(f"Skipping already processed job: {title} ({job_id})")
                     continue
+                
+                tiles.append((job_id, title, job_link))
             
-            if jobs:
-                self.last_job_title = newest_job_title
-                logger.info(f"Updated last job title to: {self.last_job_title}")
+            # Tiles not fetched this cycle are carried in pending_tiles, so the marker can move now
+            self.last_job_title = newest_job_title
+            logger.info(f"Updated last job title to: {self.last_job_title}")
             
             if self.first_run:
                 self.first_run = False
                 logger.info("First run completed")
             
-            return jobs
+            return tiles
             
         except Exception as e:
             logger.error(f"Error in fetch_jobs: {e}")
             return []
 
-    async def _fetch_and_extract_job_details(self, job_url, title):
-        """Fetch and extract job details using the working version's logic"""
+    async def _fetch_and_extract_job_details(self, job_url, title, deadline=None):
+        """Fetch and extract job details using the working version's logic.
+
+        Raises requests.exceptions.Timeout if the page can't be fetched before `deadline`.
+        """
         try:
             logger.info(f"Fetching details for: {job_url}")
-            response = self.scraper.get(job_url)
+            with phase_clock.measure('HTTP'):
+                response = self.http.get(job_url, 'description', self._request_timeout(deadline))
             print(response.status_code)
             
             # Check for 403 error and restart WARP if needed
             if response.status_code == 403:
                 logger.warning("Received 403 Forbidden error. Restarting WARP...")
                 # Retry the request after restarting WARP
-                response = self.scraper.get(job_url)
+                with phase_clock.measure('HTTP'):
+                    response = self.http.get(job_url, 'description', self._request_timeout(deadline))
             
             html = response.text
-            soup = BeautifulSoup(html, "html.parser")
+            with phase_clock.measure('HTML parsing'):
+                soup = BeautifulSoup(html, "html.parser")
             
             # Extract description
             text_element = soup.find('div', class_='break mt-2')
@@ -130,15 +245,78 @@ class UpworkScraper:
             proposal_element = soup.find(class_='value')
             proposal = proposal_element.text if proposal_element else "Not specified"
             
-            # Store description for later use
-            self.job_descriptions[job_url] = description
+            # Only pages that really contain a job are worth caching
+            if text_element:
+                self.http.store(job_url, response)
+            else:
+                logger.warning(f"No description found on {job_url} (status {response.status_code}), not caching it")
+            
+            job = Job(job_url, title, description, price, proposal)
+            # Keep the job for later use (Show More, reposts)
+            self.remember_job(job)
             
-            return (job_url, title, description, job_url, proposal, price)
+            return job
             
+        except requests.exceptions.Timeout:
+            raise
         except Exception as e:
             logger.error(f"Error fetching details for {title}: {e}")
             return None
 
+    def check_repost(self, job, candidate_id=None):
+        """Index a job and return True if it is a repost that should be suppressed.
+
+        `candidate_id` is a job whose title closely matches, checked directly in
+        case the LSH buckets miss it. In 'thread' mode reposts are kept with
+        job.repost_of set so they can be posted as replies to the original message.
+        """
+        signature = RepostDetector.signature(f"{job.title} {job.description}")
+        match = self.repost_detector.find_similar(signature)
+        if not match and candidate_id:
+            similarity = self.repost_detector.similarity(candidate_id, signature)
+            if similarity is not None and similarity >= self.repost_detector.threshold:
+                match = (candidate_id, similarity)
+        if not match:
+            self.repost_detector.add(job.id, signature)
+            return False
+        if match[0] == job.id:
+            # Same job seen again (e.g. a forced re-check), not a repost
+            return False
+
+        original_id, similarity = match
+        if REPOST_MODE == 'suppress':
+            logger.info(f"Suppressed repost of {original_id} (similarity {similarity:.2f}): {job.title}")
+            return True
+        logger.info(f"Threading repost of {original_id} (similarity {similarity:.2f}): {job.title}")
+        job.repost_of = original_id
+        return False
+
+    def _reindex_reposts(self):
+        """Rebuild both repost indexes from the cached jobs, e.g. after the signature scheme changed"""
+        self.title_detector = RepostDetector(REPOST_TITLE_THRESHOLD, REPOST_WINDOW)
+        self.repost_detector = RepostDetector(REPOST_SIMILARITY_THRESHOLD, REPOST_WINDOW)
+        for job in self.jobs.values():
+            self.title_detector.add(job.id, RepostDetector.signature(job.title))
+            self.repost_detector.add(job.id, RepostDetector.signature(f"{job.title} {job.description}"))
+        logger.info(f"Rebuilt repost indexes from {len(self.jobs)} cached jobs")
+
+    def remember_job(self, job):
+        """Keep a job in the bounded in-memory cache; older jobs are still in the archive"""
+        self.jobs[job.id] = job
+        self.jobs.move_to_end(job.id)
+        while len(self.jobs) > JOB_CACHE_SIZE:
+            self.jobs.popitem(last=False)
+
+    def record_job_message(self, job, channel_id, message_id):
+        """Remember where a job was posted so Show More and reposts can find it"""
+        self.message_job_map[message_id] = job.id
+        while len(self.message_job_map) > MESSAGE_MAP_SIZE:
+            self.message_job_map.popitem(last=False)
+        self.job_messages.setdefault(job.id, []).append((channel_id, message_id))
+        self.job_messages.move_to_end(job.id)
+        while len(self.job_messages) > REPOST_WINDOW:
+            self.job_messages.popitem(last=False)
+
     def update_last_job(self, job_title):
         """Update the last job title marker"""
         self.last_job_title = job_title
@@ -157,15 +335,57 @@ class UpworkScraper:
 
     def get_job_description(self, job_id):
         """Get the description for a job ID"""
-        return self.job_descriptions.get(job_id)
+        job = self.jobs.get(job_id)
+        return job.description if job else None
+
+    def to_snapshot(self):
+        """Scraper position and caches in a JSON-serializable form"""
+        return {
+            'last_job_title': self.last_job_title,
+            'first_run': self.first_run,
+            'filtered_jobs': sorted(self.filtered_jobs),
+            'jobs': [job.to_dict() for job in self.jobs.values()],
+            'pending_tiles': [list(tile) for tile in self.pending_tiles],
+            'message_job_map': [[message_id, job_id] for message_id, job_id in self.message_job_map.items()],
+            'job_messages': [[job_id, messages] for job_id, messages in self.job_messages.items()],
+            'title_detector': self.title_detector.to_snapshot(),
+            'repost_detector': self.repost_detector.to_snapshot(),
+        }
+
+    def restore_snapshot(self, state):
+        """Restore state saved by to_snapshot so a restart doesn't repost or refetch"""
+        self.last_job_title = state.get('last_job_title')
+        self.first_run = state.get('first_run', True)
+        self.filtered_jobs.update(state.get('filtered_jobs', []))
+        for job_data in state.get('jobs', []):
+            self.remember_job(Job.from_dict(job_data))
+        self.pending_tiles = [tuple(tile) for tile in state.get('pending_tiles', [])]
+        # Older snapshots carried fetched-but-unposted jobs; fetch them again as deferred tiles
+        self.pending_tiles += [(parse_job_id(job_data['url']) or job_data['url'], job_data['title'], job_data['url'])
+                               for job_data in state.get('unposted_jobs', [])]
+        for message_id, job_id in state.get('message_job_map', []):
+            job = self.jobs.get(job_id)
+            if job:
+                self.message_job_map[message_id] = job.id
+        while len(self.message_job_map) > MESSAGE_MAP_SIZE:
+            self.message_job_map.popitem(last=False)
+        for job_id, messages in state.get('job_messages', []):
+            self.job_messages[job_id] = [tuple(message) for message in messages]
+        if not (self.title_detector.restore_snapshot(state.get('title_detector'))
+                and self.repost_detector.restore_snapshot(state.get('repost_detector'))):
+            self._reindex_reposts()
+        logger.info(f"Restored scraper state: last job '{self.last_job_title}', {len(self.jobs)} cached jobs, "
+                    f"{len(self.pending_tiles)} deferred jobs")
 
     def get_job_activity(self, job_url):
         """Get the activity data (proposals, etc.) for a job"""
         try:
-            # If we don't have HTML for this job, fetch it
-            response = self.scraper.get(job_url)
+            # Served from the cache if the page was fetched in the last few minutes
+            with phase_clock.measure('HTTP'):
+                response = self.http.get(job_url, 'activity', self._request_timeout())
             html = response.text
-            soup = BeautifulSoup(html, "html.parser")
+            with phase_clock.measure('HTML parsing'):
+                soup = BeautifulSoup(html, "html.parser")
             
             # Extract the Activity section
             activity_section = soup.find('section', class_='air3-card-section py-4x')
@@ -196,6 +416,7 @@ class UpworkScraper:
             
             # Join all activity data into one string
             if activity_data:
+                self.http.store(job_url, response)
                 return "\n".join(activity_data)
             else:
                 return None
@@ -0,0 +1,104 @@
+import asyncio
+import time
+import logging
+from collections import deque
+from itertools import islice
+
+logger = logging.getLogger("upwork_bot")
+
+class RateLimitedSender:
+    """Background queues that deliver messages at a bounded overall rate.
+
+    Every key (a channel, a user) gets its own lane, so a slow or failing
+    destination only holds up its own messages; all lanes share the rate limit.
+    Items submitted under the same key within `batch_window` seconds are grouped
+    (up to `max_batch` per call) and handed to `send_batch(key, items)`, which
+    returns False if the batch could not be delivered.
+    """
+
+    def __init__(self, send_batch, rate, batch_window=0.0, max_batch=1):
+        self.send_batch = send_batch
+        self.interval = 1.0 / rate
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.queues = {}  # key -> deque of (item, future)
+        self.lanes = {}  # key -> task delivering that key's queue, exits once it is empty
+        self.started = False
+        self._next_send = 0.0
+
+    def start(self):
+        self.started = True
+        for key, queue in self.queues.items():
+            if queue and key not in self.lanes:
+                self.lanes[key] = asyncio.create_task(self._run_lane(key))
+
+    def submit(self, key, item):
+        """Queue an item for delivery. Returns a future that resolves to True once it was sent."""
+        future = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(key, deque()).append((item, future))
+        if self.started and key not in self.lanes:
+            self.lanes[key] = asyncio.create_task(self._run_lane(key))
+        return future
+
+    async def _run_lane(self, key):
+        queue = self.queues[key]
+        try:
+            while queue:
+                if self.batch_window and len(queue) < self.max_batch:
+                    await asyncio.sleep(self.batch_window)
+                # The batch stays queued until it has been sent, so take_pending() never misses it
+                batch = list(islice(queue, self.max_batch))
+                await self._throttle()
+                try:
+                    sent = await self.send_batch(key, [item for item, _ in batch]) is not False
+                except Exception as e:
+                    logger.error(f"Error sending batch to {key}: {e}")
+                    sent = False
+                for _ in batch:
+                    queue.popleft()
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(sent)
+        finally:
+            if self.lanes.get(key) is asyncio.current_task():
+                del self.lanes[key]
+                if not queue:
+                    self.queues.pop(key, None)
+
+    async def _throttle(self):
+        # Reserve the next slot before sleeping so concurrent lanes never share one
+        now = time.monotonic()
+        slot = max(now, self._next_send)
+        self._next_send = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _wait_idle(self):
+        while self.lanes:
+            await asyncio.wait(list(self.lanes.values()))
+        return not any(self.queues.values())
+
+    async def drain(self, timeout):
+        """Wait up to `timeout` seconds for queued items to be sent. Returns True if every queue emptied."""
+        try:
+            return await asyncio.wait_for(self._wait_idle(), max(timeout, 0))
+        except asyncio.TimeoutError:
+            return False
+
+    def take_pending(self):
+        """Stop sending and return the (key, item) pairs not yet sent, including batches in flight.
+
+        Their futures are cancelled. A batch cut off mid-send may already have been
+        delivered, so it can be sent again after a restart.
+        """
+        self.started = False
+        for lane in self.lanes.values():
+            lane.cancel()
+        self.lanes.clear()
+        pending = []
+        for key, queue in self.queues.items():
+            for item, future in queue:
+                future.cancel()
+                pending.append((key, item))
+        self.queues.clear()
+        return pending
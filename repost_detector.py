@@ -0,0 +1,127 @@
+import re
+import zlib
+from collections import deque
+
+# One-permutation MinHash: each shingle is hashed once and its hash picks one of
+# NUM_PERMUTATIONS bins, keeping the minimum per bin (empty bins borrow from the next
+# filled one). 16 bands of 4 rows keeps recall high for similarities around 0.5 and
+# above; candidates are then verified against the threshold
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+MAX_SHINGLE_WORDS = 400  # Only the start of long descriptions is needed to spot a repost
+
+BIN_BITS = 6  # NUM_PERMUTATIONS == 1 << BIN_BITS
+VALUE_BITS = 64 - BIN_BITS
+VALUE_MASK = (1 << VALUE_BITS) - 1
+HASH_MIX = 0x9E3779B97F4A7C15  # Spreads crc32 over 64 bits so the top bits pick the bin
+HASH_MASK = (1 << 64) - 1
+
+# Signatures from a different scheme can't be compared; snapshots record which one they use
+SIGNATURE_VERSION = 2
+
+WORD_PATTERN = re.compile(r"[a-z0-9$+#.]+")
+
+class RepostDetector:
+    """MinHash/LSH index over a rolling window of recent jobs to spot near-duplicate reposts"""
+
+    def __init__(self, threshold, window):
+        self.threshold = threshold
+        self.window = window
+        self.entries = deque()  # (job_id, signature), oldest first
+        self.signatures = {}  # job_id -> signature, for direct comparisons
+        self.buckets = [{} for _ in range(LSH_BANDS)]
+
+    @staticmethod
+    def signature(text):
+        """Compute the MinHash signature of a text's word and word-pair shingles"""
+        words = WORD_PATTERN.findall(text.lower())[:MAX_SHINGLE_WORDS]
+        shingles = set(words)
+        shingles.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+        if not shingles:
+            return None
+        bins = [None] * NUM_PERMUTATIONS
+        for shingle in shingles:
+            h = (zlib.crc32(shingle.encode()) * HASH_MIX) & HASH_MASK
+            index = h >> VALUE_BITS
+            value = h & VALUE_MASK
+            current = bins[index]
+            if current is None or value < current:
+                bins[index] = value
+        if None in bins:
+            # Densify: an empty bin takes the next filled bin's value, tagged with the distance
+            filled = list(bins)
+            for index in range(NUM_PERMUTATIONS):
+                if filled[index] is None:
+                    for distance in range(1, NUM_PERMUTATIONS):
+                        value = bins[(index + distance) % NUM_PERMUTATIONS]
+                        if value is not None:
+                            filled[index] = (distance << VALUE_BITS) + value
+                            break
+            bins = filled
+        return tuple(bins)
+
+    @staticmethod
+    def _band_keys(signature):
+        return [signature[band * LSH_ROWS:(band + 1) * LSH_ROWS] for band in range(LSH_BANDS)]
+
+    def find_similar(self, signature):
+        """Return (job_id, similarity) of the closest indexed job above the threshold, or None"""
+        if signature is None:
+            return None
+        candidates = {}
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            for job_id, candidate in bucket.get(key, ()):
+                candidates[job_id] = candidate
+
+        best = None
+        for job_id, candidate in candidates.items():
+            similarity = self._similarity(signature, candidate)
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (job_id, similarity)
+        return best
+
+    @staticmethod
+    def _similarity(signature, other):
+        return sum(1 for x, y in zip(signature, other) if x == y) / NUM_PERMUTATIONS
+
+    def similarity(self, job_id, signature):
+        """Estimated similarity between a signature and an indexed job, or None if it isn't indexed"""
+        other = self.signatures.get(job_id)
+        if signature is None or other is None:
+            return None
+        return self._similarity(signature, other)
+
+    def add(self, job_id, signature):
+        """Index a job, evicting the oldest one once the window is full"""
+        if signature is None:
+            return
+        entry = (job_id, signature)
+        self.entries.append(entry)
+        self.signatures[job_id] = signature
+        for bucket, key in zip(self.buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(entry)
+
+        while len(self.entries) > self.window:
+            old_entry = self.entries.popleft()
+            if self.signatures.get(old_entry[0]) is old_entry[1]:
+                del self.signatures[old_entry[0]]
+            for bucket, key in zip(self.buckets, self._band_keys(old_entry[1])):
+                members = bucket.get(key)
+                if members:
+                    members.remove(old_entry)
+                    if not members:
+                        del bucket[key]
+
+    def to_snapshot(self):
+        """Indexed entries, oldest first, in a JSON-serializable form"""
+        return {'version': SIGNATURE_VERSION,
+                'entries': [[job_id, list(signature)] for job_id, signature in self.entries]}
+
+    def restore_snapshot(self, snapshot):
+        """Re-index saved entries. Returns False if they were computed with another signature scheme."""
+        if not isinstance(snapshot, dict) or snapshot.get('version') != SIGNATURE_VERSION:
+            return False
+        for job_id, signature in snapshot['entries']:
+            self.add(job_id, tuple(signature))
+        return True
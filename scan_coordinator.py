@@ -0,0 +1,34 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("upwork_bot")
+
+class ScanCoordinator:
+    """Single-flight runner for scrape cycles.
+
+    Scheduled and on-demand scans both go through run(); a request that arrives
+    while a cycle is in flight waits for that cycle instead of starting another.
+    """
+
+    def __init__(self, run_cycle):
+        self.run_cycle = run_cycle
+        self.current = None
+        self.last_stats = None
+
+    @property
+    def running(self):
+        return self.current is not None and not self.current.done()
+
+    async def run(self):
+        """Run a cycle, or join the one in flight, and return its stats"""
+        if self.running:
+            logger.info("Scan already in progress, joining it")
+        else:
+            self.current = asyncio.ensure_future(self.run_cycle())
+            self.current.add_done_callback(self._record_stats)
+        # Shield so a cancelled caller doesn't cancel the cycle for everyone else
+        return await asyncio.shield(self.current)
+
+    def _record_stats(self, future):
+        if not future.cancelled() and future.exception() is None:
+            self.last_stats = future.result()
@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+
+from config import CHECK_INTERVAL, UPWORK_URL, JOB_QUEUE_PATH, QUEUE_RETENTION
+from job_scraper import UpworkScraper
+from job_categorizer import JobCategorizer
+from job_queue import JobQueue
+from job_archive import JobArchive
+from state_snapshot import save_snapshot, load_snapshot
+from utils import restart_warp
+
+logger = logging.getLogger("upwork_bot")
+
+
+async def run_worker(search_url, queue_path, state_path):
+    """Scrape and categorize jobs until SIGTERM/SIGINT, publishing them to the shared job queue"""
+    job_scraper = UpworkScraper(search_url)
+    job_queue = JobQueue(queue_path)
+    job_archive = JobArchive()
+
+    state = load_snapshot(state_path)
+    if state:
+        job_scraper.restore_snapshot(state.get('scraper', {}))
+
+    # Stop between cycles; published jobs are already durable in the queue
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    while not stop.is_set():
+        try:
+            jobs = await job_scraper.fetch_jobs()
+            published = 0
+
+            for job in jobs:
+                try:
+                    categories = JobCategorizer.categorize_job(job)
+                    if categories is None:
+                        logger.info(f"Filtered job by content: {job.title} ({job.id})")
+                        job_scraper.add_filtered_job(job.id)
+                        continue
+
+                    if job_queue.publish(job):
+                        published += 1
+                except Exception as e:
+                    logger.error(f"Error publishing job {job.id}: {e}")
+                    continue
+
+            job_archive.add_jobs(jobs)
+            job_queue.purge_completed(QUEUE_RETENTION)
+            logger.info(f"Worker cycle completed: {len(jobs)} fetched, {published} published, "
+                        f"{len(job_scraper.pending_tiles)} deferred. "
+                        f"Waiting {CHECK_INTERVAL} seconds before next check.")
+        except Exception as e:
+            logger.error(f"Major error in scraper worker loop: {e}")
+
+        try:
+            await asyncio.wait_for(stop.wait(), CHECK_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+    logger.info("Scraper worker shutting down")
+    save_snapshot(state_path, {'scraper': job_scraper.to_snapshot()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape Upwork jobs and publish them to the job queue")
+    parser.add_argument("--url", default=UPWORK_URL, help="Upwork search URL to scrape")
+    parser.add_argument("--queue", default=JOB_QUEUE_PATH, help="Path to the SQLite job queue")
+    parser.add_argument("--state", default="scraper_worker_state.json.gz",
+                        help="Snapshot file for warm restarts (use one per worker)")
+    parser.add_argument("--no-warp", action="store_true", help="Don't restart WARP on startup")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(process)d - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("scraper_worker.log"),
+            logging.StreamHandler()
+        ]
+    )
+
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    if not args.no_warp:
+        restart_warp()
+    asyncio.run(run_worker(args.url, args.queue, args.state))
+
+
+if __name__ == "__main__":
+    main()
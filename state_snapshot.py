@@ -0,0 +1,40 @@
+import gzip
+import json
+import os
+import time
+import logging
+
+logger = logging.getLogger("upwork_bot")
+
+SNAPSHOT_VERSION = 1
+
+def save_snapshot(path, state):
+    """Atomically write a gzipped JSON snapshot of bot state"""
+    state = dict(state, version=SNAPSHOT_VERSION, saved_at=time.time())
+    tmp_path = f"{path}.tmp"
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        logger.info(f"Saved state snapshot to {path}")
+        return True
+    except Exception as e:
+        logger.error(f"Error saving state snapshot to {path}: {e}")
+        return False
+
+def load_snapshot(path):
+    """Read a snapshot written by save_snapshot, or return None if there is no usable one"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            state = json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading state snapshot from {path}: {e}")
+        return None
+    if state.get("version") != SNAPSHOT_VERSION:
+        logger.warning(f"Ignoring state snapshot {path} with unsupported version {state.get('version')}")
+        return None
+    age = time.time() - state.get("saved_at", 0)
+    logger.info(f"Loaded state snapshot from {path} (saved {age:.0f} seconds ago)")
+    return state
@@ -0,0 +1,174 @@
+import re
+import sqlite3
+import time
+import bisect
+import logging
+from config import SUBSCRIPTIONS_PATH
+
+logger = logging.getLogger("upwork_bot")
+
+WORD_PATTERN = re.compile(r"[a-z0-9$+#.]+")
+MAX_KEYWORD_WORDS = 3  # Longest keyword phrase the index can look up
+
+def normalize_keyword(keyword):
+    """Lowercase a keyword and collapse it to the word tokens the matcher indexes"""
+    return " ".join(word.rstrip(".") for word in WORD_PATTERN.findall(keyword.lower()))
+
+def job_phrases(text):
+    """Return the set of 1- to MAX_KEYWORD_WORDS-word phrases in a job's text"""
+    words = [word.rstrip(".") for word in WORD_PATTERN.findall(text.lower())]
+    phrases = set()
+    for size in range(1, MAX_KEYWORD_WORDS + 1):
+        for i in range(len(words) - size + 1):
+            phrases.add(" ".join(words[i:i + size]))
+    return phrases
+
+class Subscription:
+    """A user's alert rule: all keywords must appear, plus optional budget and proposal limits"""
+    __slots__ = ("id", "user_id", "keywords", "min_budget", "max_proposals")
+
+    def __init__(self, id, user_id, keywords, min_budget=None, max_proposals=None):
+        self.id = id
+        self.user_id = user_id
+        self.keywords = keywords
+        self.min_budget = min_budget
+        self.max_proposals = max_proposals  # Job must have fewer proposals than this
+
+    def matches_metrics(self, metrics):
+        """Check the numeric constraints against (budget_min, budget_max, proposals_min, proposals_max)"""
+        budget_min, budget_max, proposals_min, proposals_max = metrics
+        if self.min_budget is not None and (budget_max is None or budget_max < self.min_budget):
+            return False
+        if self.max_proposals is not None and (proposals_max is None or proposals_max >= self.max_proposals):
+            return False
+        return True
+
+    def describe(self):
+        parts = [" + ".join(self.keywords)] if self.keywords else []
+        if self.min_budget is not None:
+            parts.append(f"budget ≥ ${self.min_budget:g}")
+        if self.max_proposals is not None:
+            parts.append(f"fewer than {self.max_proposals} proposals")
+        return ", ".join(parts) if parts else "all jobs"
+
+class SubscriptionMatcher:
+    """Inverted index over subscription keywords.
+
+    Each rule is indexed under a single keyword, so a job only touches rules whose
+    keyword appears in it. Rules without keywords are kept sorted by minimum budget
+    so only the ones the job's budget can satisfy are checked.
+    """
+
+    def __init__(self):
+        self.rules = {}
+        self.keyword_index = {}  # keyword -> {rule_id: rule}
+        self.budget_rules = []  # (min_budget, rule_id) for rules without keywords, sorted
+
+    def add(self, rule):
+        self.rules[rule.id] = rule
+        if rule.keywords:
+            # Index under the longest keyword, which is usually the most selective
+            key = max(rule.keywords, key=len)
+            self.keyword_index.setdefault(key, {})[rule.id] = rule
+        else:
+            bisect.insort(self.budget_rules, (rule.min_budget or 0, rule.id))
+
+    def remove(self, rule_id):
+        rule = self.rules.pop(rule_id, None)
+        if not rule:
+            return
+        if rule.keywords:
+            key = max(rule.keywords, key=len)
+            bucket = self.keyword_index.get(key, {})
+            bucket.pop(rule_id, None)
+            if not bucket:
+                self.keyword_index.pop(key, None)
+        else:
+            self.budget_rules.remove((rule.min_budget or 0, rule.id))
+
+    def match(self, title, description, metrics):
+        """Return the IDs of users with at least one rule matching the job"""
+        phrases = job_phrases(f"{title} {description}")
+        users = set()
+
+        for phrase in phrases:
+            for rule in self.keyword_index.get(phrase, {}).values():
+                if rule.user_id in users:
+                    continue
+                if all(keyword in phrases for keyword in rule.keywords) and rule.matches_metrics(metrics):
+                    users.add(rule.user_id)
+
+        budget_max = metrics[1]
+        if self.budget_rules:
+            limit = bisect.bisect_right(self.budget_rules, (budget_max if budget_max is not None else 0, float("inf")))
+            for _, rule_id in self.budget_rules[:limit]:
+                rule = self.rules[rule_id]
+                if rule.user_id not in users and rule.matches_metrics(metrics):
+                    users.add(rule.user_id)
+        return users
+
+    def mentions_keyword(self, text):
+        """Cheap pre-check: True if any indexed keyword appears in the text"""
+        return any(phrase in self.keyword_index for phrase in job_phrases(text))
+
+class SubscriptionStore:
+    """SQLite persistence for subscriptions, kept in sync with an in-memory matcher"""
+
+    def __init__(self, path=SUBSCRIPTIONS_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS subscriptions (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                keywords TEXT NOT NULL,
+                min_budget REAL,
+                max_proposals INTEGER,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self.matcher = SubscriptionMatcher()
+        for row in self.conn.execute("SELECT id, user_id, keywords, min_budget, max_proposals FROM subscriptions"):
+            self.matcher.add(self._to_subscription(row))
+        logger.info(f"Loaded {len(self.matcher.rules)} subscriptions")
+
+    @staticmethod
+    def _to_subscription(row):
+        id, user_id, keywords, min_budget, max_proposals = row
+        return Subscription(id, user_id, [k for k in keywords.split(",") if k], min_budget, max_proposals)
+
+    def add(self, user_id, keywords, min_budget=None, max_proposals=None):
+        """Create a subscription and return it"""
+        keywords = [normalize_keyword(k) for k in keywords]
+        if not all(keywords):
+            raise ValueError("keywords must contain letters or numbers")
+        cursor = self.conn.execute(
+            "INSERT INTO subscriptions (user_id, keywords, min_budget, max_proposals, created_at) VALUES (?, ?, ?, ?, ?)",
+            (user_id, ",".join(keywords), min_budget, max_proposals, time.time())
+        )
+        self.conn.commit()
+        subscription = Subscription(cursor.lastrowid, user_id, keywords, min_budget, max_proposals)
+        self.matcher.add(subscription)
+        logger.info(f"User {user_id} subscribed to: {subscription.describe()} (ID: {subscription.id})")
+        return subscription
+
+    def remove(self, user_id, subscription_id):
+        """Delete one of a user's subscriptions. Returns False if it doesn't exist or isn't theirs."""
+        rule = self.matcher.rules.get(subscription_id)
+        if not rule or rule.user_id != user_id:
+            return False
+        self.conn.execute("DELETE FROM subscriptions WHERE id = ?", (subscription_id,))
+        self.conn.commit()
+        self.matcher.remove(subscription_id)
+        logger.info(f"User {user_id} removed subscription {subscription_id}")
+        return True
+
+    def for_user(self, user_id):
+        return [rule for rule in self.matcher.rules.values() if rule.user_id == user_id]
+
+    def match(self, title, description, metrics):
+        return self.matcher.match(title, description, metrics)
+
+    def matches_title(self, title):
+        """True if a job title contains a subscribed keyword, before its description is known"""
+        return self.matcher.mentions_keyword(title)